@@ -8,12 +8,14 @@ WHAT THIS FILE DOES:
 - Makes HTTP requests to the PhishStats API
 - Implements retry logic for failed requests
 - Coordinates with cache_service.py to respect the 20 calls/minute rate limit
+- Enforces that limit client-side with services/rate_limiter.py
 - Validates API responses
 - Converts raw API data into clean format for services
 
 WHAT IT CONNECTS TO:
 - config.py: Uses API URL, timeout, and rate limit settings
 - services/cache_service.py: Checks/stores cached data to avoid redundant API calls
+- services/rate_limiter.py: Token bucket gating every upstream request
 - services/phishing_service.py: Phishing service calls this to fetch fresh data
 - models.py: Uses data models to validate API responses
 
@@ -39,16 +41,51 @@ HOW TO USE:
 """
 
 import httpx
+import orjson
 import asyncio
+import importlib.util
 import logging
+import random
+import sys
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
 
 from config import config
-from services.cache_service import CacheService
+from services.cache_service import create_cache
+from services.rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Only these fields are used downstream (models.PhishingIncident); everything
+# else in the PhishStats payload is dropped before caching.
+_INCIDENT_FIELDS = (
+    "id", "url", "latitude", "longitude", "threat_level",
+    "company", "country", "isp", "detected_at",
+)
+
+# Low-cardinality string columns shared by many records: interned so the
+# cached payload holds one copy of each distinct value.
+_INTERNED_FIELDS = frozenset({"threat_level", "country", "company"})
+
+# Client errors worth retrying (timeout, rate limited); other 4xx fail fast
+_RETRYABLE_CLIENT_ERRORS = frozenset({408, 429})
+
+# Statuses whose Retry-After header overrides the computed backoff
+_RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+
+def _accept_encoding() -> str:
+    """Compression schemes to advertise; br only when httpx can decode it."""
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        return "br, gzip, deflate"
+    return "gzip, deflate"
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP-date form is ignored)."""
+    if value and value.strip().isdigit():
+        return float(value.strip())
+    return None
+
 
 class PhishStatsClient:
     """
@@ -67,21 +104,51 @@ class PhishStatsClient:
         self.timeout = config.PHISHSTATS_TIMEOUT
         self.max_retries = config.MAX_RETRIES
         self.retry_delay = config.RETRY_DELAY_SECONDS
+        self.max_retry_delay = config.RETRY_MAX_DELAY_SECONDS
         self.cache_timeout = config.CACHE_TIMEOUT_MINUTES
+        self.stale_window = config.CACHE_STALE_WINDOW_SECONDS
+        
+        # Use cache service to store/retrieve API responses. With
+        # CACHE_BACKEND=redis every worker shares it; Redis keeps entries
+        # through the stale window so stale-while-revalidate still works.
+        self.cache = create_cache(ttl_seconds=self.cache_timeout * 60 + self.stale_window)
         
-        # Use cache service to store/retrieve API responses
-        self.cache = CacheService()
+        # Client-side quota: never send more than API_RATE_LIMIT calls/minute
+        self._bucket = TokenBucket(config.API_RATE_LIMIT, burst=config.API_RATE_LIMIT)
         
-        logger.info(f"PhishStatsClient initialized | URL: {self.base_url}")
+        # Long-lived HTTP client (created lazily inside the running event loop)
+        # so retries and refreshes reuse pooled keep-alive connections instead
+        # of paying a fresh TCP + TLS handshake on every call.
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Single-flight: while one upstream fetch is running, every other
+        # caller that misses the cache (or a background stale refresh) shares
+        # the same task instead of starting its own API call.
+        self._inflight: Optional[asyncio.Task] = None
+        
+        # Validators from the last 200 response, sent back as If-None-Match /
+        # If-Modified-Since so an unchanged upstream answers 304 with no body.
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        
+        # Bumped every time the cache takes a new payload (not on a 304), so
+        # anything derived from the incidents can tell whether it is current.
+        # Tracked by the payload's "stored" stamp, so a refresh written to a
+        # shared cache by another worker bumps it too.
+        self.version = 0
+        self._payload_stored: Optional[float] = None
+        
+        logger.info("PhishStatsClient initialized | URL: %s", self.base_url)
     
     async def fetch_incidents(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Fetch phishing incidents from PhishStats API or return cached data.
         
-        STRATEGY:
-        1. Check if fresh cached data exists (< CACHE_TIMEOUT_MINUTES old)
-        2. If cached data is fresh: Return it (SAVES AN API CALL!)
-        3. If cache is stale/empty: Fetch from API and cache the result
+        STRATEGY (stale-while-revalidate):
+        1. Cached data younger than CACHE_TIMEOUT_MINUTES: Return it (SAVES AN API CALL!)
+        2. Cached data stale by less than CACHE_STALE_WINDOW_SECONDS: Return it
+           immediately and refresh the cache in the background
+        3. Cache empty or too stale: Fetch from API and cache the result
         
         Args:
             force_refresh (bool): If True, bypass cache and fetch fresh data
@@ -111,80 +178,275 @@ class PhishStatsClient:
         # STEP 1: Check cache (respects API rate limits)
         # ──────────────────────────────────────────────────────────────────
         if not force_refresh:
-            cached_data = self.cache.get(cache_key)
+            entry = await self.cache.aget_entry(cache_key)
+            cached_data = entry["value"] if entry else None
             
-            if cached_data and not self.cache.is_expired(cache_key, self.cache_timeout):
-                logger.info(f"✓ Returning cached phishing data ({len(cached_data)} incidents)")
-                return cached_data
-            elif cached_data:
-                logger.info(f"✗ Cached data is stale (> {self.cache_timeout} min old), fetching fresh...")
+            if cached_data:
+                age = self.cache.entry_age(entry)
+                fresh_for = self.cache_timeout * 60
+                
+                if age <= fresh_for:
+                    logger.debug("✓ Returning cached phishing data (%d incidents)", len(cached_data))
+                    self._note_payload(entry)
+                    return cached_data
+                
+                if age <= fresh_for + self.stale_window:
+                    logger.info("✗ Cached data is stale (> %s min old), refreshing in background...", self.cache_timeout)
+                    self._start_refresh(cache_key)
+                    self._note_payload(entry)
+                    return cached_data
+                
+                logger.info("✗ Cached data is too stale (%.0fs old), fetching fresh...", age)
         
         # ──────────────────────────────────────────────────────────────────
-        # STEP 2: Fetch from API with retry logic
+        # STEP 2: Fetch from API (coalesced with any fetch already running)
         # ──────────────────────────────────────────────────────────────────
-        data = await self._fetch_from_api_with_retries()
+        # shield() so one cancelled caller doesn't cancel the fetch for the rest
+        return await asyncio.shield(self._start_refresh(cache_key))
+    
+    def _start_refresh(self, cache_key: str) -> asyncio.Task:
+        """Start a cache refresh, or return the one already in flight."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh_cache(cache_key))
+            self._inflight.add_done_callback(self._clear_inflight)
+        return self._inflight
+    
+    async def _refresh_cache(self, cache_key: str) -> List[Dict[str, Any]]:
+        """Fetch from the API with retry logic and cache the new data."""
+        # Only revalidate when there is a cached body to fall back on
+        conditional = await self.cache.aage_seconds(cache_key) is not None
+        data = await self._fetch_from_api_with_retries(conditional=conditional)
+        
+        if data is None:
+            # 304 Not Modified: keep the cached body and restart its TTL
+            await self.cache.atouch(cache_key)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                logger.info("✓ PhishStats data not modified, reusing cached incidents")
+                return cached
+            # The body expired or was evicted while the request was in flight,
+            # so the 304 has nothing to point at; ask for the full payload
+            logger.warning("✗ Cached incidents gone after a 304, refetching without validators")
+            data = await self._fetch_from_api_with_retries() or []
         
-        # ──────────────────────────────────────────────────────────────────
-        # STEP 3: Validate and cache the new data
-        # ──────────────────────────────────────────────────────────────────
         if data:
-            self.cache.set(cache_key, data)
-            logger.info(f"✓ Fetched and cached {len(data)} incidents from PhishStats API")
+            await self.cache.aset(cache_key, data)
+            self._note_payload(await self.cache.aget_entry(cache_key))
+            logger.info("✓ Fetched and cached %d incidents from PhishStats API", len(data))
             return data
         
         return []
     
-    async def _fetch_from_api_with_retries(self) -> List[Dict[str, Any]]:
+    @property
+    def payload_tag(self) -> str:
+        """
+        Opaque id of the payload fetch_incidents() last returned.
+        
+        Unlike version (a per-process counter) it is the payload's "stored"
+        stamp, so every worker reading one shared cache reports the same tag.
+        """
+        return repr(self._payload_stored)
+    
+    def _note_payload(self, entry: Optional[Dict[str, Any]]) -> None:
+        """Bump the version if this cached payload isn't the one seen last."""
+        stored = entry.get("stored") if entry else None
+        if stored != self._payload_stored:
+            self._payload_stored = stored
+            self.version += 1
+    
+    def _clear_inflight(self, task: asyncio.Task) -> None:
+        """Forget the finished fetch so the next cache miss starts a new one."""
+        if self._inflight is task:
+            self._inflight = None
+        
+        # Background refreshes may have no awaiting caller; log their failure
+        # here so it isn't reported as "exception was never retrieved".
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("✗ PhishStats refresh failed: %s", task.exception())
+    
+    def _build_limits(self) -> httpx.Limits:
+        """
+        Connection-pool limits shaped for exactly one upstream host.
+        
+        Keep-alive expiry defaults to just past the cache timeout so the next
+        scheduled refresh reuses the connection opened by the previous one.
+        """
+        if config.HTTPX_KEEPALIVE:
+            keepalive_expiry = float(config.HTTPX_KEEPALIVE)
+        else:
+            keepalive_expiry = max(60, self.cache_timeout * 60 + 30)
+        
+        return httpx.Limits(
+            max_connections=config.HTTPX_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTPX_MAX_KEEPALIVE,
+            keepalive_expiry=keepalive_expiry
+        )
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared httpx client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self._build_limits(),
+                headers={
+                    "User-Agent": f"{config.APP_NAME}/{config.APP_VERSION}",
+                    # JSON compresses 5-10x; httpx decompresses transparently
+                    "Accept-Encoding": _accept_encoding(),
+                }
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client (called on application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _fetch_from_api_with_retries(self, conditional: bool = False) -> Optional[List[Dict[str, Any]]]:
         """
         Make HTTP request to PhishStats API with retry logic.
         
-        Retries up to MAX_RETRIES times with exponential backoff if the
-        API is temporarily unavailable.
+        With conditional=True the request carries If-None-Match /
+        If-Modified-Since from the previous response, and a 304 reply
+        returns None instead of re-downloading the payload.
+        
+        Retries up to MAX_RETRIES times with decorrelated jittered exponential
+        backoff if the API is temporarily unavailable, so multiple clients
+        don't retry in lockstep. A Retry-After header on 429/503 is honored.
+        Client errors (4xx other than 408/429) are not retried.
+        
+        Args:
+            conditional (bool): Send the stored validators with the request
         
         Returns:
-            List[Dict]: Raw API response as list of incident dicts
+            List[Dict]: Raw API response as list of incident dicts, or None
+            if the server answered 304 Not Modified
         """
         
+        client = self._get_client()
+        headers = self._conditional_headers() if conditional else {}
+        delay = float(self.retry_delay)
+        
         for attempt in range(1, self.max_retries + 1):
+            retry_after = None
+            
             try:
-                logger.info(f"Fetching from PhishStats API (attempt {attempt}/{self.max_retries})...")
+                logger.info("Fetching from PhishStats API (attempt %s/%s)...", attempt, self.max_retries)
+                
+                await self._bucket.acquire()
+                response = await client.get("", headers=headers)
+                
+                if response.status_code == 304:
+                    logger.info("✓ PhishStats returned 304 Not Modified")
+                    return None
+                
+                # Raise exception for bad status codes
+                response.raise_for_status()
+                
+                # orjson parses the raw bytes directly; much faster than stdlib json
+                data = self._slim_records(orjson.loads(response.content))
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+                logger.info("✓ Successfully received %d records from PhishStats", len(data))
+                return data
                 
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        self.base_url,
-                        timeout=self.timeout,
-                        headers={
-                            "User-Agent": f"{config.APP_NAME}/{config.APP_VERSION}"
-                        }
-                    )
-                    
-                    # Raise exception for bad status codes
-                    response.raise_for_status()
-                    
-                    data = response.json()
-                    logger.info(f"✓ Successfully received {len(data)} records from PhishStats")
-                    return data
-                    
             except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP Error {e.response.status_code}: {e.response.text}")
-                if attempt < self.max_retries:
-                    await asyncio.sleep(self.retry_delay)
+                status = e.response.status_code
+                logger.error("HTTP Error %s: %s", status, e.response.text)
+                
+                if 400 <= status < 500 and status not in _RETRYABLE_CLIENT_ERRORS:
+                    raise Exception(
+                        f"PhishStats API rejected the request with HTTP {status}"
+                    ) from e
+                
+                if status in _RETRY_AFTER_STATUSES:
+                    retry_after = _parse_retry_after(e.response.headers.get("Retry-After"))
                     
             except httpx.RequestError as e:
-                logger.error(f"Request Error: {e}")
-                if attempt < self.max_retries:
-                    await asyncio.sleep(self.retry_delay)
+                logger.error("Request Error: %s", e)
             
             except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-                if attempt < self.max_retries:
-                    await asyncio.sleep(self.retry_delay)
+                logger.error("Unexpected error: %s", e)
+            
+            if attempt < self.max_retries:
+                delay = self._next_backoff(delay)
+                if retry_after is not None:
+                    delay = min(retry_after, self.max_retry_delay)
+                await asyncio.sleep(delay)
         
         # All retries exhausted
         raise Exception(
             f"Failed to fetch from PhishStats API after {self.max_retries} attempts"
         )
     
+    def _conditional_headers(self) -> Dict[str, str]:
+        """Revalidation headers built from the last successful response."""
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+    
+    def _next_backoff(self, previous: float) -> float:
+        """
+        Decorrelated jitter: sleep = min(cap, uniform(base, previous * 3)).
+        
+        Grows roughly exponentially with each attempt while spreading retries
+        from different callers apart.
+        """
+        return min(
+            self.max_retry_delay,
+            random.uniform(self.retry_delay, previous * 3)
+        )
+    
+    def _slim_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        One pass over the raw API payload before it is cached.
+        
+        Drops records with missing/invalid coordinates, keeps only the fields
+        listed in _INCIDENT_FIELDS, and interns repeated string values. Smaller
+        dicts mean less memory per cached payload and cheaper iteration on
+        every cache hit.
+        
+        Args:
+            records: Raw list of incident dicts from PhishStats
+        
+        Returns:
+            List[Dict]: Projected incidents with valid coordinates
+        """
+        slim = []
+        append = slim.append
+        intern = sys.intern
+        
+        # Bounds hoisted into locals: the loop compares floats directly
+        # instead of a validate_coordinates() call + 4 config lookups per row.
+        min_lat, max_lat = config.MIN_LATITUDE, config.MAX_LATITUDE
+        min_lon, max_lon = config.MIN_LONGITUDE, config.MAX_LONGITUDE
+        
+        for record in records:
+            try:
+                lat = float(record.get("latitude"))
+                lon = float(record.get("longitude"))
+            except (TypeError, ValueError):
+                continue
+            
+            # NaN fails both comparisons, so it is dropped here too
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                continue
+            
+            row = {}
+            for key in _INCIDENT_FIELDS:
+                if key in record:
+                    value = record[key]
+                    if key in _INTERNED_FIELDS and isinstance(value, str):
+                        value = intern(value)
+                    row[key] = value
+            append(row)
+        
+        return slim
+    
     def validate_coordinates(self, latitude: float, longitude: float) -> bool:
         """
         Validate that coordinates are within valid ranges.
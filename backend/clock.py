@@ -0,0 +1,44 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: clock.py
+PURPOSE: Cheap "current time" strings for high-frequency endpoints
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Formats the current UTC time as ISO 8601 at most once per second
+- Hands every caller within that second the same string
+
+WHAT IT CONNECTS TO:
+- main.py: /health timestamp
+- routes/analytics.py: /api/analytics/health timestamp
+
+HOW TO USE:
+    from clock import now_iso_cached
+    
+    stamp = now_iso_cached()  # "2026-02-21T10:30:00.123456+00:00"
+
+Only use this where one-second resolution is good enough (health probes),
+never for data timestamps.
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import time
+from datetime import datetime, timezone
+
+# [formatted_at (epoch seconds), formatted string]
+_ts_cache = [0.0, ""]
+
+
+def now_iso_cached() -> str:
+    """
+    Current UTC time in ISO 8601, re-formatted at most once per second.
+    
+    Returns:
+        str: e.g. "2026-02-21T10:30:00.123456+00:00"
+    """
+    t = time.time()
+    if t - _ts_cache[0] >= 1.0:
+        _ts_cache[0] = t
+        _ts_cache[1] = datetime.fromtimestamp(t, timezone.utc).isoformat()
+    return _ts_cache[1]
@@ -32,11 +32,15 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Settings:
     """
     Central configuration object for the entire Phish 'N Heat backend.
     All values should be defined here and passed to other modules.
+    
+    Slotted and frozen: attribute reads go through slot descriptors instead
+    of an instance __dict__, and nothing can reassign a setting at runtime.
+    Use dataclasses.replace(config, ...) to derive a modified copy.
     """
     
     # ──────────────────────────────────────────────────────────────────────────
@@ -54,8 +58,32 @@ class Settings:
     # ──────────────────────────────────────────────────────────────────────────
     API_RATE_LIMIT: int = 20  # calls per minute allowed by PhishStats
     CACHE_TIMEOUT_MINUTES: int = 5  # how long to cache data before refreshing
+    # past the timeout, keep serving stale data this long while a background
+    # refresh runs (stale-while-revalidate); older data blocks on a fetch
+    CACHE_STALE_WINDOW_SECONDS: int = int(os.getenv("CACHE_STALE_WINDOW_SECONDS", "300"))
+    # per-CacheService entry cap; the least recently used key is evicted first
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    # "memory" (per worker) or "redis" (PhishStats data and recorded endpoint
+    # responses shared by all workers; needs the optional redis package)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory").lower()
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # how often a background task rebuilds the derived data (validated
+    # incidents, statistics, indexes) for new PhishStats payloads, so no
+    # request pays for it; 0 disables the task
+    PRECOMPUTE_INTERVAL_SECONDS: int = int(os.getenv("PRECOMPUTE_INTERVAL_SECONDS", "60"))
     MAX_RETRIES: int = 3  # retry failed API calls this many times
-    RETRY_DELAY_SECONDS: int = 2  # wait this long between retries
+    RETRY_DELAY_SECONDS: int = 2  # base delay for jittered exponential backoff
+    RETRY_MAX_DELAY_SECONDS: int = 60  # cap on any single retry delay
+    
+    # ──────────────────────────────────────────────────────────────────────────
+    # HTTP CONNECTION POOL
+    # Sized for a single upstream host; keep-alive outlives the cache timeout so
+    # the next scheduled refresh still finds a warm connection
+    # ──────────────────────────────────────────────────────────────────────────
+    HTTPX_MAX_CONNECTIONS: int = int(os.getenv("HTTPX_MAX_CONNECTIONS", "4"))
+    HTTPX_MAX_KEEPALIVE: int = int(os.getenv("HTTPX_MAX_KEEPALIVE", "2"))
+    # seconds; empty = derive from CACHE_TIMEOUT_MINUTES
+    HTTPX_KEEPALIVE: str = os.getenv("HTTPX_KEEPALIVE", "")
     
     # ──────────────────────────────────────────────────────────────────────────
     # DATABASE CONFIGURATION
@@ -96,9 +124,3 @@ class Settings:
 
 # Single global instance used throughout the application
 config = Settings()
-
-# Print configuration on startup (for debugging, remove in production)
-if config.DEBUG:
-    print(f"[DEBUG] {config.APP_NAME} v{config.APP_VERSION} initialized")
-    print(f"[DEBUG] PhishStats API URL: {config.PHISHSTATS_API_URL}")
-    print(f"[DEBUG] Cache timeout: {config.CACHE_TIMEOUT_MINUTES} minutes")
@@ -54,3 +54,8 @@ CREATE TABLE IF NOT EXISTS phishing_links (
     inserted_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
+
+-- Serves both the ingest cursor (GET_NEWEST_DATE_SQL: MAX(date)) and the map
+-- read (MAP_POINTS_SELECT_SQL: ORDER BY date DESC LIMIT ?) from the index,
+-- instead of a full scan + sort of phishing_links on every request.
+CREATE INDEX IF NOT EXISTS ix_phishing_links_date ON phishing_links(date DESC);
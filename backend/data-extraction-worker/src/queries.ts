@@ -94,6 +94,9 @@ ON CONFLICT(id) DO UPDATE SET
     technology = excluded.technology,
     page_text = excluded.page_text,
     ssl_fingerprint = excluded.ssl_fingerprint
+-- Rows re-fetched by the cursor overlap are usually unchanged; skip the
+-- rewrite unless PhishStats bumped date_update for the record.
+WHERE excluded.date_update IS NOT phishing_links.date_update
 `.trim();
 
 export const GET_NEWEST_DATE_SQL =
@@ -0,0 +1,51 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: dependencies.py
+PURPOSE: FastAPI dependencies that hand routes the shared service instances
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Returns the process-wide PhishingService / AnalyticsService that main.py's
+  lifespan stores on app.state
+- Lets route handlers receive them with Depends() instead of building their
+  own copies at import time
+
+WHAT IT CONNECTS TO:
+- main.py: lifespan() creates the services and puts them on app.state
+- routes/phishing.py, routes/analytics.py: Inject the services
+- services/: The service classes being shared
+
+ARCHITECTURE:
+    main.py lifespan
+         ↓ app.state.phishing_service = PhishingService()
+         ↓ app.state.analytics_service = AnalyticsService(phishing_service)
+    Request → Depends(get_phishing_service) → request.app.state.phishing_service
+
+    One PhishingService means one API client, one cached incident list and
+    one set of per-version lookups for phishing AND analytics endpoints.
+
+HOW TO USE:
+    from fastapi import Depends
+    from dependencies import get_phishing_service
+
+    @router.get("/phishing/stats")
+    async def get_statistics(svc: PhishingService = Depends(get_phishing_service)):
+        return await svc.get_threat_statistics()
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+from fastapi import Request
+
+from services.analytics_service import AnalyticsService
+from services.phishing_service import PhishingService
+
+
+def get_phishing_service(request: Request) -> PhishingService:
+    """The shared PhishingService created in main.py's lifespan."""
+    return request.app.state.phishing_service
+
+
+def get_analytics_service(request: Request) -> AnalyticsService:
+    """The shared AnalyticsService created in main.py's lifespan."""
+    return request.app.state.analytics_service
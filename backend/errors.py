@@ -0,0 +1,58 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: errors.py
+PURPOSE: The one exception type services raise to routes
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Defines ServiceError, raised when a service can't answer a request
+- Wraps any underlying failure in a ServiceError with a client-safe message,
+  keeping the original as __cause__ for the logs
+
+WHAT IT CONNECTS TO:
+- services/phishing_service.py, services/analytics_service.py: Raise it
+- main.py: Turns it into a 500 response (inside the CORS/GZip middleware,
+  so error responses carry the same headers as any other)
+
+HOW TO USE:
+    from errors import ServiceError, as_service_error
+
+    try:
+        rows = await fetch()
+    except Exception as e:
+        raise as_service_error("Could not fetch incidents", e)
+
+The message is what API clients see as "detail"; upstream exception text
+(URLs, hostnames, stack details) only reaches the server log.
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+
+class ServiceError(Exception):
+    """A service failed; str(error) is safe to show to API clients."""
+
+
+def as_service_error(message: str, exc: BaseException) -> ServiceError:
+    """
+    The ServiceError to raise for exc.
+
+    A ServiceError from a nested service call passes through unchanged, so
+    the innermost (most specific) message wins.
+
+    Args:
+        message: Client-facing description of what failed
+        exc: The exception being handled
+
+    Returns:
+        exc itself if already a ServiceError, else a new one chained to it
+
+    Example:
+        except Exception as e:
+            raise as_service_error("Could not compute statistics", e)
+    """
+    if isinstance(exc, ServiceError):
+        return exc
+    error = ServiceError(message)
+    error.__cause__ = exc
+    return error
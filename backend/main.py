@@ -8,14 +8,20 @@ WHAT THIS FILE DOES:
 - Initializes FastAPI application
 - Registers all route modules (phishing, analytics)
 - Configures CORS for frontend communication
+- Gzip-compresses larger responses
+- Caches analytics responses (middleware/response_cache.py)
 - Sets up logging
 - Provides health check endpoint
+- Turns service errors (errors.ServiceError) into JSON 500 responses
 - Serves API documentation (Swagger UI)
 
 WHAT IT CONNECTS TO:
 - config.py: Uses app settings and CORS configuration
 - routes/phishing.py: Registers phishing endpoints
 - routes/analytics.py: Registers analytics endpoints
+- middleware/: ASGI middleware (analytics response cache)
+- dependencies.py: Hands routes the services built in lifespan()
+- errors.py: ServiceError, answered here as a JSON 500
 - All services: Imported via routes
 
 ARCHITECTURE:
@@ -52,13 +58,23 @@ HOW TO USE:
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
+import asyncio
 import logging
-from datetime import datetime
-from fastapi import FastAPI
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
+from clock import now_iso_cached
 from config import config
+from errors import ServiceError
 from routes import phishing, analytics
+from middleware import ResponseCacheMiddleware
+from services.analytics_service import AnalyticsService
+from services.phishing_service import PhishingService
 
 # Configure logging
 logging.basicConfig(
@@ -67,6 +83,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+if config.DEBUG:
+    logger.debug("%s v%s initialized", config.APP_NAME, config.APP_VERSION)
+    logger.debug("PhishStats API URL: %s", config.PHISHSTATS_API_URL)
+    logger.debug("Cache timeout: %s minutes", config.CACHE_TIMEOUT_MINUTES)
+
 
 def _cors_allow_origins():
     """Merge primary origin, FRONTEND_ORIGINS (comma-separated), and optional local dev defaults."""
@@ -102,6 +123,54 @@ def _cors_allow_origins():
     return out
 
 
+async def _precompute_loop(
+    phishing_service: PhishingService,
+    analytics_service: AnalyticsService,
+    interval: int
+) -> None:
+    """Every interval seconds, build derived data for any new PhishStats payload."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await phishing_service.precompute()
+            await analytics_service.precompute()
+        except Exception as e:
+            # Requests still compute on demand; try again next round
+            logger.warning("✗ Background precompute failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the process-wide services on startup; release their pooled HTTP
+    connections on shutdown.
+    
+    Phishing and analytics routes share ONE PhishingService (see
+    dependencies.py), so both read the same cached incidents. A background
+    task keeps their per-version results built ahead of requests.
+    """
+    phishing_service = PhishingService()
+    analytics_service = AnalyticsService(phishing_service)
+    app.state.phishing_service = phishing_service
+    app.state.analytics_service = analytics_service
+    
+    precompute_task = None
+    if config.PRECOMPUTE_INTERVAL_SECONDS > 0:
+        precompute_task = asyncio.create_task(_precompute_loop(
+            phishing_service, analytics_service, config.PRECOMPUTE_INTERVAL_SECONDS
+        ))
+    
+    yield
+    
+    if precompute_task is not None:
+        precompute_task.cancel()
+        try:
+            await precompute_task
+        except asyncio.CancelledError:
+            pass
+    await phishing_service.api_client.aclose()
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # INITIALIZE FASTAPI APPLICATION
 # ──────────────────────────────────────────────────────────────────────────────
@@ -111,45 +180,123 @@ app = FastAPI(
     description="Backend API for Phish 'N Heat - Global Phishing Tracker",
     docs_url="/docs",  # Swagger UI at /docs
     openapi_url="/openapi.json",  # JSON schema
-    redoc_url="/redoc"  # ReDoc at /redoc
+    redoc_url="/redoc",  # ReDoc at /redoc
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson for every route's JSON
 )
 
+# ──────────────────────────────────────────────────────────────────────────────
+# SERVE DOCS FROM PRECOMPUTED BYTES
+# ──────────────────────────────────────────────────────────────────────────────
+# The schema and docs pages never change once the app is built, so each is
+# rendered on its first request and replayed as bytes afterwards.
+def _serve_precomputed(path, build, media_type):
+    """Replace the route at `path` with one serving build()'s bytes, computed once."""
+    body = None
+    
+    async def endpoint(request):
+        nonlocal body
+        if body is None:
+            body = build()
+        return Response(content=body, media_type=media_type)
+    
+    app.router.routes[:] = [r for r in app.router.routes if getattr(r, "path", None) != path]
+    app.add_route(path, endpoint, include_in_schema=False)
+
+
+if app.openapi_url:
+    _serve_precomputed(
+        app.openapi_url,
+        lambda: orjson.dumps(app.openapi()),
+        "application/json"
+    )
+if app.docs_url:
+    _serve_precomputed(
+        app.docs_url,
+        lambda: get_swagger_ui_html(
+            openapi_url=app.openapi_url,
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url
+        ).body,
+        "text/html"
+    )
+if app.redoc_url:
+    _serve_precomputed(
+        app.redoc_url,
+        lambda: get_redoc_html(openapi_url=app.openapi_url, title=f"{app.title} - ReDoc").body,
+        "text/html"
+    )
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CACHE ANALYTICS RESPONSES
+# ──────────────────────────────────────────────────────────────────────────────
+# Added before CORS so CORS wraps it: cached bodies never carry another
+# origin's Access-Control-* headers.
+app.add_middleware(ResponseCacheMiddleware)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # CONFIGURE CORS (Cross-Origin Resource Sharing)
 # ──────────────────────────────────────────────────────────────────────────────
-# This allows the frontend to communicate with the backend
+# This allows the frontend to communicate with the backend.
+# Starlette's CORSMiddleware is already pure ASGI and pre-joins its header
+# values at startup; handing it a frozenset makes the per-request
+# origin check a hash lookup instead of a list scan.
 _cors_origins = _cors_allow_origins()
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=_cors_origins,
+    allow_origins=frozenset(_cors_origins),
     allow_credentials=True,
-    allow_methods=["*"],  # Allow all HTTP methods
-    allow_headers=["*"],  # Allow all headers
+    # Explicit lists: preflight answers are precomputed headers instead of
+    # echoing whatever the browser asked for. Every API route is a GET.
+    allow_methods=["GET", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
+    # Let the browser read the pagination/heatmap headers cross-origin
+    expose_headers=["X-Next-Cursor", "X-Incident-Count", "X-Heatmap-Scale", "ETag"],
 )
 
 logger.info("CORS allow_origins: %s", _cors_origins)
 
+# ──────────────────────────────────────────────────────────────────────────────
+# COMPRESS RESPONSES
+# ──────────────────────────────────────────────────────────────────────────────
+# Outermost, so cached and CORS-tagged responses alike are compressed on the
+# way out. Bodies under 512 bytes (/health, small rankings) are sent as-is.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # REGISTER ROUTE MODULES
 # ──────────────────────────────────────────────────────────────────────────────
 # These register all API endpoints
 
+# Both modules hang off one api_router; the /api prefix and 404 response are
+# declared once, when it is included (an APIRouter's own prefix is not applied
+# to plain ASGI routes such as the analytics overview endpoint)
+api_router = APIRouter()
+api_router.include_router(phishing.router, tags=["phishing"])
+api_router.include_router(analytics.router, tags=["analytics"])
 app.include_router(
-    phishing.router,
-    prefix="/api",
-    tags=["phishing"],
-    responses={404: {"description": "Not found"}}
-)
-
-app.include_router(
-    analytics.router,
+    api_router,
     prefix="/api",
-    tags=["analytics"],
     responses={404: {"description": "Not found"}}
 )
 
 logger.info("✓ Route modules registered")
 
+# ──────────────────────────────────────────────────────────────────────────────
+# SERVICE ERRORS
+# ──────────────────────────────────────────────────────────────────────────────
+# Route handlers let service errors propagate; they are logged and turned
+# into a 500 here instead of in a try/except around every handler. Handlers
+# for a specific exception class run inside the middleware stack, so these
+# responses still get CORS headers and the stale-cache fallback.
+
+@app.exception_handler(ServiceError)
+async def service_error_handler(request, exc):
+    """Log the traceback and answer 500 with the service's client-safe message."""
+    logger.error("✗ Service error in %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse({"detail": str(exc)}, status_code=500)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # HEALTH CHECK ENDPOINT
 # ──────────────────────────────────────────────────────────────────────────────
@@ -179,10 +326,46 @@ async def health_check():
         "status": "healthy",
         "app_name": config.APP_NAME,
         "version": config.APP_VERSION,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso_cached()
     }
 
 
+# /info and / never change at runtime: serialize them once at import
+_INFO_JSON = orjson.dumps({
+    "name": config.APP_NAME,
+    "version": config.APP_VERSION,
+    "description": "Backend API for Phish 'N Heat - Global Phishing Tracker",
+    "api_base": "/api",
+    "docs_url": "/docs",
+    "redoc_url": "/redoc",
+    "endpoints": {
+        "phishing": {
+            "all": "/api/phishing/",
+            "heatmap": "/api/phishing/heatmap",
+            "map_points": "/api/phishing/map-points",
+            "filtered": "/api/phishing/filtered",
+            "stats": "/api/phishing/stats",
+            "refresh": "/api/phishing/refresh"
+        },
+        "analytics": {
+            "overview": "/api/analytics/overview",
+            "threat_distribution": "/api/analytics/threat-distribution",
+            "top_regions": "/api/analytics/top-regions",
+            "top_companies": "/api/analytics/top-companies",
+            "hotspots": "/api/analytics/threat-hotspots",
+            "isp_rankings": "/api/analytics/isp-rankings"
+        }
+    }
+})
+
+_ROOT_JSON = orjson.dumps({
+    "message": f"Welcome to {config.APP_NAME} v{config.APP_VERSION}",
+    "docs": "/docs",
+    "info": "/info",
+    "health": "/health"
+})
+
+
 @app.get("/info")
 async def app_info():
     """
@@ -209,32 +392,7 @@ async def app_info():
             }
         }
     """
-    return {
-        "name": config.APP_NAME,
-        "version": config.APP_VERSION,
-        "description": "Backend API for Phish 'N Heat - Global Phishing Tracker",
-        "api_base": "/api",
-        "docs_url": "/docs",
-        "redoc_url": "/redoc",
-        "endpoints": {
-            "phishing": {
-                "all": "/api/phishing/",
-                "heatmap": "/api/phishing/heatmap",
-                "map_points": "/api/phishing/map-points",
-                "filtered": "/api/phishing/filtered",
-                "stats": "/api/phishing/stats",
-                "refresh": "/api/phishing/refresh"
-            },
-            "analytics": {
-                "overview": "/api/analytics/overview",
-                "threat_distribution": "/api/analytics/threat-distribution",
-                "top_regions": "/api/analytics/top-regions",
-                "top_companies": "/api/analytics/top-companies",
-                "hotspots": "/api/analytics/threat-hotspots",
-                "isp_rankings": "/api/analytics/isp-rankings"
-            }
-        }
-    }
+    return Response(content=_INFO_JSON, media_type="application/json")
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -260,12 +418,7 @@ async def root():
             "health": "/health"
         }
     """
-    return {
-        "message": f"Welcome to {config.APP_NAME} v{config.APP_VERSION}",
-        "docs": "/docs",
-        "info": "/info",
-        "health": "/health"
-    }
+    return Response(content=_ROOT_JSON, media_type="application/json")
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -273,16 +426,20 @@ async def root():
 # ──────────────────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     
-    logger.info(f"Starting {config.APP_NAME} v{config.APP_VERSION}")
-    logger.info(f"Listening on {config.BACKEND_HOST}:{config.BACKEND_PORT}")
-    logger.info(f"Documentation: http://{config.BACKEND_HOST}:{config.BACKEND_PORT}/docs")
+    logger.info("Starting %s v%s", config.APP_NAME, config.APP_VERSION)
+    logger.info("Listening on %s:%s", config.BACKEND_HOST, config.BACKEND_PORT)
+    logger.info("Documentation: http://%s:%s/docs", config.BACKEND_HOST, config.BACKEND_PORT)
     
     # Run the server
     uvicorn.run(
         app,
         host=config.BACKEND_HOST,
         port=config.BACKEND_PORT,
-        log_level=config.LOG_LEVEL.lower()
+        log_level=config.LOG_LEVEL.lower(),
+        # uvicorn[standard] ships uvloop + httptools; uvloop has no Windows build
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
@@ -0,0 +1,5 @@
+"""ASGI middleware installed by main.py."""
+
+from .response_cache import ResponseCacheMiddleware, etag_matches, response_cache
+
+__all__ = ["ResponseCacheMiddleware", "etag_matches", "response_cache"]
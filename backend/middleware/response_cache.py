@@ -0,0 +1,187 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: middleware/response_cache.py
+PURPOSE: Cache the finished responses of the read-only GET endpoints
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Wraps the ASGI app and intercepts GET /api/analytics/* and the
+  read-only /api/phishing/* requests
+- Replays a cached (status, headers, body) on a fresh hit without ever
+  calling the route handler or the services
+- On a miss, forwards the response as it streams and records it for next time
+- If the handler fails (5xx or exception), answers with the last stale entry
+  instead of an error
+- Answers 304 Not Modified on a fresh hit whose ETag the client already has
+
+WHAT IT CONNECTS TO:
+- services/cache_service.py: Stores the recorded responses (create_cache(), so
+  with CACHE_BACKEND=redis every worker shares them and a clear() from
+  /api/phishing/refresh reaches all of them)
+- routes/analytics.py, routes/phishing.py: The endpoints being cached
+  (/api/phishing/refresh clears the cache after a forced re-fetch)
+- main.py: Installs the middleware (inside CORS, so CORS headers stay per-origin)
+
+ARCHITECTURE:
+    Request: GET /api/analytics/overview
+         ↓
+    ResponseCacheMiddleware (THIS FILE)
+         ↓ fresh hit?  → replay cached bytes (X-Cache: HIT), or 304 on If-None-Match
+         ↓ miss        → routes/analytics.py → record response (X-Cache: MISS)
+         ↓ 5xx + stale → replay stale bytes (X-Cache: STALE)
+
+HOW TO USE:
+    from middleware import ResponseCacheMiddleware
+    
+    app.add_middleware(ResponseCacheMiddleware)
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from services.cache_service import CacheService, create_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds each endpoint's response stays fresh; paths not listed are never
+# cached (e.g. /api/analytics/health must always hit the service).
+_PATH_TTLS: Dict[str, int] = {
+    "/api/analytics/overview": 30,
+    "/api/analytics/threat-hotspots": 30,
+    "/api/analytics/threat-distribution": 10,
+    "/api/analytics/top-regions": 60,
+    "/api/analytics/top-companies": 60,
+    "/api/analytics/isp-rankings": 60,
+    "/api/phishing/": 60,
+    "/api/phishing/heatmap": 60,
+    "/api/phishing/filtered": 60,
+    "/api/phishing/stats": 60,
+}
+
+# Shared store of recorded responses: key -> [status, headers, body], with
+# header names/values and the body as latin-1 strings so the entry is JSON
+# (a byte-for-byte round trip) and can live in Redis. Redis drops an entry
+# once the longest TTL has passed, which bounds the stale fallback there.
+response_cache = create_cache(ttl_seconds=max(_PATH_TTLS.values()), prefix="phishnheat:responses:")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header value covers this ETag.
+    
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match: W/
+    prefixes are ignored, and "*" matches anything.
+    
+    Example:
+        etag_matches('W/"12.5-json", W/"9.0-json"', 'W/"12.5-json"')  # True
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.strip().removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+    Pure-ASGI response cache keyed on (path, query string, Accept).
+    
+    Accept is part of the key because /api/phishing/heatmap answers JSON or
+    packed binary depending on it.
+    
+    Only successful (200) responses are recorded. Entries past their TTL are
+    kept as a fallback for when the handler starts failing.
+    """
+    
+    def __init__(self, app, cache: CacheService = response_cache):
+        """
+        Args:
+            app: The wrapped ASGI application
+            cache: Where recorded responses are stored
+        """
+        self.app = app
+        self.cache = cache
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        
+        ttl = _PATH_TTLS.get(scope["path"])
+        if ttl is None:
+            await self.app(scope, receive, send)
+            return
+        
+        accept = next((value for name, value in scope["headers"] if name == b"accept"), b"")
+        key = scope["path"] + "?" + scope["query_string"].decode("latin-1") + "#" + accept.decode("latin-1")
+        cached = await self.cache.aget_entry(key)
+        entry = cached["value"] if cached is not None else None
+        
+        # ──────────────────────────────────────────────────────────────────
+        # Fresh hit: replay without touching the route handler
+        # ──────────────────────────────────────────────────────────────────
+        if entry is not None and self.cache.entry_age(cached) <= ttl:
+            if_none_match = next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+            if if_none_match is not None:
+                etag = next((value for name, value in entry[1] if name == "etag"), None)
+                if etag is not None and etag_matches(if_none_match.decode("latin-1"), etag):
+                    await self._replay(send, [304, [["etag", etag]], ""], b"HIT")
+                    return
+            await self._replay(send, entry, b"HIT")
+            return
+        
+        # ──────────────────────────────────────────────────────────────────
+        # Miss: forward the response while recording it
+        # ──────────────────────────────────────────────────────────────────
+        state: Dict[str, Any] = {"status": None, "headers": None, "body": [], "use_stale": False}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if status >= 500 and entry is not None:
+                    state["use_stale"] = True
+                    return
+                state["status"] = status
+                state["headers"] = list(message.get("headers", []))
+                message = {**message, "headers": state["headers"] + [(b"x-cache", b"MISS")]}
+            
+            elif message["type"] == "http.response.body":
+                if state["use_stale"]:
+                    return
+                state["body"].append(message.get("body", b""))
+                if not message.get("more_body", False) and state["status"] == 200:
+                    await self.cache.aset(key, [
+                        200,
+                        [[name.decode("latin-1"), value.decode("latin-1")] for name, value in state["headers"]],
+                        b"".join(state["body"]).decode("latin-1")
+                    ])
+            
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if entry is None or state["status"] is not None:
+                raise
+            logger.exception("✗ %s failed, serving stale cached response", scope["path"])
+            state["use_stale"] = True
+        
+        if state["use_stale"]:
+            logger.warning("✗ Serving stale cached response for %s", key)
+            await self._replay(send, entry, b"STALE")
+    
+    @staticmethod
+    async def _replay(send, entry: List[Any], marker: bytes) -> None:
+        """Send a recorded [status, headers, body] entry, tagged with an X-Cache header."""
+        status, headers, body = entry
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers] + [(b"x-cache", marker)],
+        })
+        await send({"type": "http.response.body", "body": body.encode("latin-1")})
@@ -46,11 +46,32 @@ HOW TO USE:
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+import functools
+import sys
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+from typing import Iterator, List, Optional
 from datetime import datetime
 
 
+_THREAT_LEVELS = ('none', 'low', 'moderate', 'elevated', 'high', 'critical', 'unknown')
+# level -> the one shared str object for it, so every validated incident
+# points at the same interned string instead of its own parsed copy
+_CANONICAL_THREAT_LEVELS = {level: sys.intern(level) for level in _THREAT_LEVELS}
+
+
+def canonical_threat_level(level: str) -> Optional[str]:
+    """
+    The shared canonical string for a threat level in any case, or None.
+    
+    Example:
+        canonical_threat_level("HIGH")   # "high"
+        canonical_threat_level("sever")  # None
+    """
+    # Feeds already send lowercase; skip allocating a copy in that case
+    return _CANONICAL_THREAT_LEVELS.get(level if level.islower() else level.lower())
+
+
 class PhishingIncident(BaseModel):
     """
     Represents a single phishing incident from the PhishStats API.
@@ -77,17 +98,21 @@ class PhishingIncident(BaseModel):
     country: Optional[str] = None
     isp: Optional[str] = None
     
-    @validator('threat_level')
+    @field_validator('threat_level', mode='after')
+    @classmethod
     def validate_threat_level(cls, v):
         """Ensure threat level is one of the allowed values."""
-        allowed = ['none', 'low', 'moderate', 'elevated', 'high', 'critical', 'unknown']
-        if v.lower() not in allowed:
-            raise ValueError(f"threat_level must be one of {allowed}")
-        return v.lower()
-    
-    class Config:
-        """Pydantic config for this model."""
-        json_schema_extra = {
+        level = canonical_threat_level(v)
+        if level is None:
+            raise ValueError(f"threat_level must be one of {list(_THREAT_LEVELS)}")
+        return level
+    
+    # Validated incidents are cached and shared by every request, so they
+    # must not be mutated
+    model_config = ConfigDict(
+        frozen=True,
+        defer_build=True,
+        json_schema_extra={
             "example": {
                 "id": 123,
                 "url": "http://malicious-site.com",
@@ -99,7 +124,60 @@ class PhishingIncident(BaseModel):
                 "country": "United States",
                 "isp": "ISP Name"
             }
-        }
+        },
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _incidents_adapter() -> TypeAdapter:
+    # Built on first use so PhishingIncident's deferred schema stays deferred
+    return TypeAdapter(List[PhishingIncident])
+
+
+def validate_incidents(rows: List[dict]) -> List[PhishingIncident]:
+    """
+    Validate a whole payload of incident dicts in one call.
+    
+    The list is looped inside pydantic-core instead of building one model per
+    Python-level call. Raises ValidationError if ANY row is invalid.
+    
+    Example:
+        incidents = validate_incidents([{"url": "...", "latitude": 1, "longitude": 2}])
+    """
+    return _incidents_adapter().validate_python(rows)
+
+
+def dump_incidents_json(incidents: List[PhishingIncident]) -> bytes:
+    """
+    Serialize validated incidents straight to JSON bytes.
+    
+    pydantic-core writes the whole list in one call, skipping the
+    per-model dict that .dict() + jsonable_encoder would build first.
+    
+    Example:
+        body = dump_incidents_json(incidents)  # b'[{"id":1,...}]'
+    """
+    return _incidents_adapter().dump_json(incidents)
+
+
+@functools.lru_cache(maxsize=1)
+def _incident_adapter() -> TypeAdapter:
+    return TypeAdapter(PhishingIncident)
+
+
+def iter_incidents_ndjson(incidents: List[PhishingIncident], batch_size: int = 100) -> Iterator[bytes]:
+    """
+    Incidents as newline-delimited JSON, batch_size lines per chunk.
+    
+    Each line is one incident object; chunks let a streaming response send
+    (and the client parse) the first rows before the last are encoded.
+    
+    Example:
+        b"".join(iter_incidents_ndjson(incidents))  # b'{"id":1,...}\n{"id":2,...}\n'
+    """
+    dump = _incident_adapter().dump_json
+    for start in range(0, len(incidents), batch_size):
+        yield b"".join(dump(inc) + b"\n" for inc in incidents[start:start + batch_size])
 
 
 class HeatmapCoordinate(BaseModel):
@@ -111,13 +189,15 @@ class HeatmapCoordinate(BaseModel):
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        defer_build=True,
+        json_schema_extra={
             "example": {
                 "latitude": 40.7128,
                 "longitude": -74.0060
             }
-        }
+        },
+    )
 
 
 class HeatmapData(BaseModel):
@@ -131,8 +211,9 @@ class HeatmapData(BaseModel):
     incident_count: int = Field(..., ge=0)
     last_updated: datetime
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        defer_build=True,
+        json_schema_extra={
             "example": {
                 "coordinates": [
                     [40.7128, -74.0060],
@@ -142,7 +223,8 @@ class HeatmapData(BaseModel):
                 "incident_count": 3,
                 "last_updated": "2026-02-21T10:30:00Z"
             }
-        }
+        },
+    )
 
 
 class ThreatStatistics(BaseModel):
@@ -162,8 +244,9 @@ class ThreatStatistics(BaseModel):
     most_active_countries: List[str]
     last_updated: datetime
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        defer_build=True,
+        json_schema_extra={
             "example": {
                 "total_incidents": 1000,
                 "critical_count": 50,
@@ -176,7 +259,8 @@ class ThreatStatistics(BaseModel):
                 "most_active_countries": ["United States", "China", "Russia"],
                 "last_updated": "2026-02-21T10:30:00Z"
             }
-        }
+        },
+    )
 
 
 class FilterRequest(BaseModel):
@@ -197,6 +281,8 @@ class FilterRequest(BaseModel):
     isp: Optional[str] = None
     limit: int = Field(default=100, ge=1, le=1000)
     offset: int = Field(default=0, ge=0)
+    
+    model_config = ConfigDict(defer_build=True)
 
 
 class MapPoint(BaseModel):
@@ -215,8 +301,9 @@ class MapPoint(BaseModel):
     country: Optional[str] = None
     isp: Optional[str] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        defer_build=True,
+        json_schema_extra={
             "example": {
                 "lat": 40.7128,
                 "lon": -74.0060,
@@ -227,4 +314,20 @@ class MapPoint(BaseModel):
                 "country": "United States",
                 "isp": "Example ISP",
             }
-        }
+        },
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _map_points_adapter() -> TypeAdapter:
+    return TypeAdapter(List[MapPoint])
+
+
+def dump_map_points_json(points: List[MapPoint]) -> bytes:
+    """
+    Serialize map points straight to JSON bytes (see dump_incidents_json).
+    
+    Example:
+        body = dump_map_points_json(points)  # b'[{"lat":40.7,...}]'
+    """
+    return _map_points_adapter().dump_json(points)
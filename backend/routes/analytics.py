@@ -12,6 +12,7 @@ WHAT THIS FILE DOES:
 
 WHAT IT CONNECTS TO:
 - services/analytics_service.py: Calls analytics methods
+- dependencies.py: Injects the shared AnalyticsService (Depends)
 - models.py: Returns structured response models
 - main.py: Registers these routes with FastAPI
 
@@ -58,8 +59,11 @@ HOW TO USE:
 
 import logging
 from typing import Optional
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 
+from clock import now_iso_cached
+from dependencies import get_analytics_service
 from services.analytics_service import AnalyticsService
 
 logger = logging.getLogger(__name__)
@@ -67,12 +71,11 @@ logger = logging.getLogger(__name__)
 # Create FastAPI router for analytics endpoints
 router = APIRouter()
 
-# Initialize service
-analytics_service = AnalyticsService()
 
-
-@router.get("/analytics/overview")
-async def get_threat_overview():
+@router.get("/analytics/overview", response_class=ORJSONResponse)
+async def get_threat_overview(
+    svc: AnalyticsService = Depends(get_analytics_service)
+):
     """
     Get comprehensive overview of all threat data.
     
@@ -112,20 +115,19 @@ async def get_threat_overview():
             "last_updated": "2026-02-21T10:30:00Z"
         }
     """
-    try:
-        logger.info("GET /api/analytics/overview")
-        
-        overview = await analytics_service.get_threat_overview()
-        
-        return overview
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_threat_overview: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/overview")
+    
+    overview = await svc.get_threat_overview()
+    
+    # Returned as a response so FastAPI skips jsonable_encoder on the
+    # busiest analytics route; orjson writes the bytes directly
+    return ORJSONResponse(overview)
 
 
 @router.get("/analytics/threat-distribution")
-async def get_threat_distribution():
+async def get_threat_distribution(
+    svc: AnalyticsService = Depends(get_analytics_service)
+):
     """
     Get count of incidents by threat level.
     
@@ -147,21 +149,17 @@ async def get_threat_distribution():
             "unknown": 0
         }
     """
-    try:
-        logger.info("GET /api/analytics/threat-distribution")
-        
-        distribution = await analytics_service.get_threat_levels_distribution()
-        
-        return distribution
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_threat_distribution: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/threat-distribution")
+    
+    distribution = await svc.get_threat_levels_distribution()
+    
+    return distribution
 
 
 @router.get("/analytics/top-regions")
 async def get_top_regions(
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    svc: AnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get regions with the most phishing incidents.
@@ -187,22 +185,18 @@ async def get_top_regions(
             ["Brazil", 65]
         ]
     """
-    try:
-        logger.info(f"GET /api/analytics/top-regions | limit={limit}")
-        
-        regions = await analytics_service.get_top_threat_regions(limit=limit)
-        
-        # Convert tuples to lists for JSON serialization
-        return [[country, count] for country, count in regions]
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_top_regions: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/top-regions | limit=%s", limit)
+    
+    regions = await svc.get_top_threat_regions(limit=limit)
+    
+    # orjson writes the (name, count) tuples as JSON arrays directly
+    return ORJSONResponse(regions)
 
 
 @router.get("/analytics/top-companies")
 async def get_top_companies(
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    svc: AnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get companies that are most frequently targeted by phishers.
@@ -229,22 +223,18 @@ async def get_top_companies(
             ...
         ]
     """
-    try:
-        logger.info(f"GET /api/analytics/top-companies | limit={limit}")
-        
-        companies = await analytics_service.get_most_targeted_companies(limit=limit)
-        
-        # Convert tuples to lists for JSON serialization
-        return [[company, count] for company, count in companies]
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_top_companies: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/top-companies | limit=%s", limit)
+    
+    companies = await svc.get_most_targeted_companies(limit=limit)
+    
+    # orjson writes the (name, count) tuples as JSON arrays directly
+    return ORJSONResponse(companies)
 
 
 @router.get("/analytics/threat-hotspots")
 async def get_threat_hotspots(
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    svc: AnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get geographic hotspots of phishing activity with threat breakdowns.
@@ -282,21 +272,17 @@ async def get_threat_hotspots(
             ...
         ]
     """
-    try:
-        logger.info(f"GET /api/analytics/threat-hotspots | limit={limit}")
-        
-        hotspots = await analytics_service.get_threat_hotspots(limit=limit)
-        
-        return hotspots
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_threat_hotspots: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/threat-hotspots | limit=%s", limit)
+    
+    hotspots = await svc.get_threat_hotspots(limit=limit)
+    
+    return hotspots
 
 
 @router.get("/analytics/isp-rankings")
 async def get_isp_rankings(
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    svc: AnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get Internet Service Providers (ISPs) with most phishing activity.
@@ -321,17 +307,12 @@ async def get_isp_rankings(
             ...
         ]
     """
-    try:
-        logger.info(f"GET /api/analytics/isp-rankings | limit={limit}")
-        
-        isps = await analytics_service.get_isp_threat_rankings(limit=limit)
-        
-        # Convert tuples to lists for JSON serialization
-        return [[isp, count] for isp, count in isps]
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_isp_rankings: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/isp-rankings | limit=%s", limit)
+    
+    isps = await svc.get_isp_threat_rankings(limit=limit)
+    
+    # orjson writes the (name, count) tuples as JSON arrays directly
+    return ORJSONResponse(isps)
 
 
 @router.get("/analytics/health")
@@ -354,17 +335,10 @@ async def analytics_health():
             "timestamp": "2026-02-21T10:30:00Z"
         }
     """
-    try:
-        logger.info("GET /api/analytics/health")
-        
-        from datetime import datetime
-        
-        return {
-            "status": "healthy",
-            "service": "analytics",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"✗ Error in analytics_health: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("GET /api/analytics/health")
+    
+    return {
+        "status": "healthy",
+        "service": "analytics",
+        "timestamp": now_iso_cached()
+    }
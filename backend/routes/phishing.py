@@ -12,6 +12,7 @@ WHAT THIS FILE DOES:
 
 WHAT IT CONNECTS TO:
 - services/phishing_service.py: Calls these services for business logic
+- dependencies.py: Injects the shared PhishingService (Depends)
 - models.py: Uses Pydantic models for request/response validation
 - main.py: Registers these routes with FastAPI
 
@@ -29,7 +30,7 @@ ARCHITECTURE:
 API ENDPOINTS PROVIDED:
     GET /api/phishing/
         - Get all phishing incidents
-        - Query params: limit, offset, threat_level
+        - Query params: limit, cursor, offset (deprecated), threat_level
     
     GET /api/phishing/heatmap
         - Get coordinates for heatmap visualization
@@ -42,7 +43,11 @@ API ENDPOINTS PROVIDED:
     
     GET /api/phishing/filtered
         - Get incidents with multiple filters
-        - Query params: threat_level, company, country, isp, limit, offset
+        - Query params: threat_level, company, country, isp, limit, cursor, offset (deprecated)
+    
+    GET /api/phishing/stream
+        - Same filters as /filtered, streamed as NDJSON (one incident per line)
+        - Query params: threat_level, company, country, isp, limit, cursor
     
     GET /api/phishing/{id}
         - Get a single incident by ID
@@ -60,26 +65,64 @@ HOW TO USE:
 """
 
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, Query, HTTPException
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
-from services.phishing_service import PhishingService
-from models import PhishingIncident, HeatmapData, MapPoint
+from dependencies import get_phishing_service
+from middleware import etag_matches, response_cache
+from services.phishing_service import HEATMAP_QUANT_SCALE, PhishingService, decode_cursor, encode_cursor
+from models import PhishingIncident, HeatmapData, MapPoint, ThreatStatistics, dump_incidents_json, dump_map_points_json, iter_incidents_ndjson
 
 logger = logging.getLogger(__name__)
 
 # Create FastAPI router for phishing endpoints
 router = APIRouter()
 
-# Initialize service
-phishing_service = PhishingService()
+
+def _after_id(cursor: Optional[str]) -> Optional[int]:
+    """Decode the ?cursor= query value, answering 400 for a malformed one."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _next_cursor_headers(incidents: List[PhishingIncident], limit: int) -> Dict[str, str]:
+    """X-Next-Cursor pointing at the page after this one, if it could be non-empty."""
+    if len(incidents) == limit and incidents[-1].id is not None:
+        return {"X-Next-Cursor": encode_cursor(incidents[-1].id)}
+    return {}
+
+
+def _etag(tag: str, *parts) -> str:
+    """Weak ETag for a response derived from the payload `tag` plus its parameters."""
+    return 'W/"' + "-".join([tag, *(str(p) for p in parts)]) + '"'
+
+
+def _not_modified(etag: str) -> Response:
+    """304 for a client that already holds this ETag; no body is built."""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _incidents_response(incidents: List[PhishingIncident], limit: int) -> Response:
+    """A page of incidents serialized once, in pydantic-core, with X-Next-Cursor."""
+    return Response(
+        content=dump_incidents_json(incidents),
+        media_type="application/json",
+        headers=_next_cursor_headers(incidents, limit)
+    )
 
 
-@router.get("/phishing/", response_model=list)
+@router.get("/phishing/", response_model=List[PhishingIncident])
 async def get_all_incidents(
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
-    threat_level: Optional[str] = Query(None)
+    offset: int = Query(0, ge=0, deprecated=True),
+    threat_level: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    svc: PhishingService = Depends(get_phishing_service)
 ):
     """
     Get all phishing incidents (with optional filtering).
@@ -88,11 +131,13 @@ async def get_all_incidents(
     
     Args:
         limit: How many results to return (max 1000)
-        offset: Number of results to skip (for pagination)
+        offset: Number of results to skip (deprecated, use cursor)
         threat_level: Optional filter (low, medium, high, critical)
+        cursor: X-Next-Cursor value from the previous page
     
     Returns:
-        List of PhishingIncident objects
+        List of PhishingIncident objects. A full page also carries an
+        X-Next-Cursor header to pass back as ?cursor= for the next one.
     
     Example:
         GET /api/phishing/?limit=50&threat_level=high
@@ -110,26 +155,28 @@ async def get_all_incidents(
             ...
         ]
     """
-    try:
-        logger.info(f"GET /api/phishing/ | limit={limit}, offset={offset}, threat_level={threat_level}")
-        
-        incidents = await phishing_service.get_filtered_incidents(
-            threat_level=threat_level,
-            limit=limit,
-            offset=offset
-        )
-        
-        return [incident.dict() for incident in incidents]
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_all_incidents: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    after_id = _after_id(cursor)
+    
+    logger.debug("GET /api/phishing/ | limit=%s, offset=%s, threat_level=%s, cursor=%s", limit, offset, threat_level, cursor)
+    
+    incidents = await svc.get_filtered_incidents(
+        threat_level=threat_level,
+        limit=limit,
+        offset=offset,
+        after_id=after_id
+    )
+    
+    return _incidents_response(incidents, limit)
 
 
 @router.get("/phishing/heatmap", response_model=HeatmapData)
 async def get_heatmap_data(
     threat_level: Optional[str] = Query(None),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    quantize: bool = Query(False),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    svc: PhishingService = Depends(get_phishing_service)
 ):
     """
     Get heatmap coordinates for visualization.
@@ -140,12 +187,22 @@ async def get_heatmap_data(
     Args:
         threat_level: Optional filter (low, medium, high, critical)
         limit: Maximum coordinates to return
+        quantize: Binary responses only: int16 columns on a 0.01° grid
     
     Returns:
         HeatmapData object with:
         - coordinates: List of [lat, lon] pairs
         - incident_count: How many incidents
         - last_updated: Timestamp
+        
+        With "Accept: application/octet-stream": the same points as packed
+        little-endian float32 (all latitudes, then all longitudes), with the
+        incident count in the X-Incident-Count header. Add ?quantize=true
+        for int16 columns instead; multiply by the X-Heatmap-Scale header
+        (0.01) to get degrees.
+        
+        Every response carries a weak ETag for the current payload; sending
+        it back as If-None-Match answers 304 until PhishStats data changes.
     
     Example:
         GET /api/phishing/heatmap?threat_level=critical
@@ -161,29 +218,50 @@ async def get_heatmap_data(
             "last_updated": "2026-02-21T10:30:00Z"
         }
     """
-    try:
-        logger.info(f"GET /api/phishing/heatmap | threat_level={threat_level}, limit={limit}")
-        
-        heatmap_data = await phishing_service.get_heatmap_data(
+    logger.debug("GET /api/phishing/heatmap | threat_level=%s, limit=%s", threat_level, limit)
+    
+    binary = bool(accept and "application/octet-stream" in accept)
+    level = threat_level.lower() if threat_level else ""
+    etag = _etag(
+        await svc.data_tag(),
+        "bin" if binary else "json", level, limit, int(binary and quantize)
+    )
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    if binary:
+        body, count = await svc.get_heatmap_packed(
             threat_level=threat_level,
-            limit=limit
+            limit=limit,
+            quantize=quantize
         )
-        
-        return heatmap_data
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_heatmap_data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        headers = {"X-Incident-Count": str(count), "ETag": etag}
+        if quantize:
+            headers["X-Heatmap-Scale"] = str(1 / HEATMAP_QUANT_SCALE)
+        return Response(
+            content=body,
+            media_type="application/octet-stream",
+            headers=headers
+        )
+    
+    # Coordinates pre-encoded by orjson per version, no response_model revalidation
+    body = await svc.get_heatmap_json(
+        threat_level=threat_level,
+        limit=limit
+    )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
-@router.get("/phishing/filtered", response_model=list)
+@router.get("/phishing/filtered", response_model=List[PhishingIncident])
 async def get_filtered_incidents(
     threat_level: Optional[str] = Query(None),
     company: Optional[str] = Query(None),
     country: Optional[str] = Query(None),
     isp: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0, deprecated=True),
+    cursor: Optional[str] = Query(None),
+    svc: PhishingService = Depends(get_phishing_service)
 ):
     """
     Get incidents with advanced filtering options.
@@ -194,10 +272,12 @@ async def get_filtered_incidents(
         country: Filter by country of origin (e.g., "United States")
         isp: Filter by Internet Service Provider
         limit: Maximum results
-        offset: Number of results to skip
+        offset: Number of results to skip (deprecated, use cursor)
+        cursor: X-Next-Cursor value from the previous page
     
     Returns:
-        List of PhishingIncident objects matching filters
+        List of PhishingIncident objects matching filters, with
+        X-Next-Cursor set when another page may follow
     
     Example:
         GET /api/phishing/filtered?company=PayPal&threat_level=critical&limit=50
@@ -213,23 +293,75 @@ async def get_filtered_incidents(
             }
         ]
     """
-    try:
-        logger.info(f"GET /api/phishing/filtered | threat={threat_level}, company={company}, country={country}")
-        
-        incidents = await phishing_service.get_filtered_incidents(
-            threat_level=threat_level,
-            company=company,
-            country=country,
-            isp=isp,
-            limit=limit,
-            offset=offset
-        )
-        
-        return [incident.dict() for incident in incidents]
+    after_id = _after_id(cursor)
+    
+    logger.debug("GET /api/phishing/filtered | threat=%s, company=%s, country=%s", threat_level, company, country)
+    
+    incidents = await svc.get_filtered_incidents(
+        threat_level=threat_level,
+        company=company,
+        country=country,
+        isp=isp,
+        limit=limit,
+        offset=offset,
+        after_id=after_id
+    )
+    
+    return _incidents_response(incidents, limit)
+
+
+@router.get("/phishing/stream")
+async def stream_incidents(
+    threat_level: Optional[str] = Query(None),
+    company: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    isp: Optional[str] = Query(None),
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    svc: PhishingService = Depends(get_phishing_service)
+):
+    """
+    Stream filtered incidents as newline-delimited JSON.
+    
+    For large pages: rows are encoded and sent in batches, so the client can
+    start parsing before the whole page is serialized and the server never
+    holds the full JSON array in memory.
+    
+    Args:
+        threat_level, company, country, isp: Same filters as /filtered
+        limit: Maximum incidents to stream
+        cursor: X-Next-Cursor value from the previous page
+    
+    Returns:
+        application/x-ndjson body, one PhishingIncident object per line,
+        with X-Next-Cursor set when another page may follow
+    
+    Example:
+        GET /api/phishing/stream?threat_level=critical
         
-    except Exception as e:
-        logger.error(f"✗ Error in get_filtered_incidents: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        Response:
+        {"id": 1, "url": "http://phishing.com", "threat_level": "critical", ...}
+        {"id": 7, "url": "http://other.com", "threat_level": "critical", ...}
+    """
+    after_id = _after_id(cursor)
+    
+    logger.debug("GET /api/phishing/stream | threat=%s, company=%s, country=%s, limit=%s", threat_level, company, country, limit)
+    
+    incidents = await svc.get_filtered_incidents(
+        threat_level=threat_level,
+        company=company,
+        country=country,
+        isp=isp,
+        limit=limit,
+        after_id=after_id
+    )
+    
+    # Sync iterator: Starlette encodes each batch off the event loop
+    return StreamingResponse(
+        iter_incidents_ndjson(incidents),
+        media_type="application/x-ndjson",
+        headers=_next_cursor_headers(incidents, limit)
+    )
 
 
 @router.get("/phishing/map-points", response_model=List[MapPoint])
@@ -240,6 +372,7 @@ async def get_map_points(
     isp: Optional[str] = Query(None),
     limit: int = Query(500, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    svc: PhishingService = Depends(get_phishing_service)
 ):
     """
     Points for the ShowMeTheVillain Plotly map (densitymapbox).
@@ -261,32 +394,32 @@ async def get_map_points(
             }
         ]
     """
-    try:
-        logger.info(
-            "GET /api/phishing/map-points | threat=%s company=%s country=%s isp=%s limit=%s offset=%s",
-            threat_level,
-            company,
-            country,
-            isp,
-            limit,
-            offset,
-        )
-        points = await phishing_service.get_map_points(
-            threat_level=threat_level,
-            company=company,
-            country=country,
-            isp=isp,
-            limit=limit,
-            offset=offset,
-        )
-        return points
-    except Exception as e:
-        logger.error(f"✗ Error in get_map_points: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug(
+        "GET /api/phishing/map-points | threat=%s company=%s country=%s isp=%s limit=%s offset=%s",
+        threat_level,
+        company,
+        country,
+        isp,
+        limit,
+        offset,
+    )
+    points = await svc.get_map_points(
+        threat_level=threat_level,
+        company=company,
+        country=country,
+        isp=isp,
+        limit=limit,
+        offset=offset,
+    )
+    # Serialized once in pydantic-core, no response_model revalidation
+    return Response(content=dump_map_points_json(points), media_type="application/json")
 
 
-@router.get("/phishing/stats")
-async def get_statistics():
+@router.get("/phishing/stats", response_model=ThreatStatistics)
+async def get_statistics(
+    if_none_match: Optional[str] = Header(None),
+    svc: PhishingService = Depends(get_phishing_service)
+):
     """
     Get threat statistics (counts by threat level, top companies, etc).
     
@@ -307,25 +440,35 @@ async def get_statistics():
             "most_active_countries": ["United States", "China", "Russia"],
             "last_updated": "2026-02-21T10:30:00Z"
         }
-    """
-    try:
-        logger.info(f"GET /api/phishing/stats")
         
-        stats = await phishing_service.get_threat_statistics()
-        
-        return stats.dict()
-        
-    except Exception as e:
-        logger.error(f"✗ Error in get_statistics: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        Carries a weak ETag; If-None-Match with it answers 304 until the
+        data changes.
+    """
+    logger.debug("GET /api/phishing/stats")
+    
+    etag = _etag(await svc.data_tag(), "stats")
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    stats = await svc.get_threat_statistics()
+    
+    # Serialized once in pydantic-core, no response_model revalidation
+    return Response(
+        content=stats.model_dump_json(),
+        media_type="application/json",
+        headers={"ETag": etag}
+    )
 
 
 @router.get("/phishing/refresh")
-async def refresh_data():
+async def refresh_data(
+    svc: PhishingService = Depends(get_phishing_service)
+):
     """
     Force refresh of phishing data from the API.
     
-    Bypasses cache and fetches fresh data from PhishStats.
+    Bypasses cache and fetches fresh data from PhishStats, then drops
+    every cached endpoint response so the next reads see the new data.
     Useful for testing or when cache timeout might be too long.
     
     Returns:
@@ -341,17 +484,13 @@ async def refresh_data():
             "incident_count": 342
         }
     """
-    try:
-        logger.info(f"GET /api/phishing/refresh (forcing cache bypass)")
-        
-        incidents = await phishing_service.api_client.fetch_incidents(force_refresh=True)
-        
-        return {
-            "status": "success",
-            "message": "Data refreshed from PhishStats API",
-            "incident_count": len(incidents)
-        }
-        
-    except Exception as e:
-        logger.error(f"✗ Error in refresh_data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.info("GET /api/phishing/refresh (forcing cache bypass)")
+    
+    incident_count = await svc.refresh_incidents()
+    await response_cache.aclear()
+    
+    return {
+        "status": "success",
+        "message": "Data refreshed from PhishStats API",
+        "incident_count": incident_count
+    }
@@ -34,7 +34,7 @@ ARCHITECTURE:
 HOW TO USE:
     from services.analytics_service import AnalyticsService
     
-    analytics = AnalyticsService()
+    analytics = AnalyticsService(phishing_service)
     
     # Get threat statistics
     stats = await analytics.get_threat_levels_distribution()
@@ -51,15 +51,86 @@ HOW TO USE:
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
+import heapq
 import logging
 from typing import Dict, List, Tuple, Any
 from collections import Counter
+from operator import attrgetter
 from datetime import datetime, timedelta
 
+from errors import as_service_error
+from models import PhishingIncident
+from services.cache_service import CacheService
 from services.phishing_service import PhishingService
 
 logger = logging.getLogger(__name__)
 
+# Keys of get_threat_levels_distribution(), in response order
+_DISTRIBUTION_LEVELS = ('critical', 'high', 'elevated', 'moderate', 'low', 'none', 'unknown')
+# Per-level columns of a hotspot row, after the total in slot 0
+_HOTSPOT_LEVELS = ('critical', 'high', 'medium', 'low')
+
+
+def _aggregate(incidents: List[PhishingIncident]) -> Dict[str, Any]:
+    """
+    Compute every analytics count from one read of each incident field.
+    
+    Returns:
+        {
+            "distribution": {"critical": 2, "high": 1, ...},
+            "countries": Counter({"United States": 2, ...}),
+            "companies": Counter({"PayPal": 3, ...}),
+            "isps": Counter({"ISP-A": 2, ...}),
+            "hotspots": {"United States": (total, critical, high, medium, low), ...}
+        }
+    """
+    # Column-at-a-time: pull each field out once, then let Counter tally it
+    # in C instead of incrementing counters from a Python loop per incident.
+    # threat_level is lower-cased (and interned) by PhishingIncident already
+    levels = list(map(attrgetter("threat_level"), incidents))
+    country_col = list(map(attrgetter("country"), incidents))
+    
+    level_counts = Counter(levels)
+    distribution = {level: level_counts[level] for level in _DISTRIBUTION_LEVELS}
+    
+    countries = Counter(filter(None, country_col))
+    companies = Counter(filter(None, map(attrgetter("company"), incidents)))
+    isps = Counter(filter(None, map(attrgetter("isp"), incidents)))
+    
+    # Hotspots group missing countries under "Unknown"
+    spots = [country or "Unknown" for country in country_col]
+    spot_levels = Counter(zip(spots, levels))
+    # Fixed 5-slot rows; only the top few become dicts (see _top_hotspots)
+    hotspots: Dict[str, Tuple[int, ...]] = {
+        spot: (total, *[spot_levels[(spot, level)] for level in _HOTSPOT_LEVELS])
+        for spot, total in Counter(spots).items()
+    }
+    
+    return {
+        "distribution": distribution,
+        "countries": countries,
+        "companies": companies,
+        "isps": isps,
+        "hotspots": hotspots,
+    }
+
+
+def _top_hotspots(hotspots: Dict[str, Tuple[int, ...]], limit: int) -> List[Dict[str, Any]]:
+    """The `limit` busiest hotspot rows, descending by total, as response dicts."""
+    # nlargest keeps the sorted(..., reverse=True)[:limit] order, ties included
+    top = heapq.nlargest(limit, hotspots.items(), key=lambda item: item[1][0])
+    return [
+        {
+            "country": spot,
+            "total_incidents": row[0],
+            "critical": row[1],
+            "high": row[2],
+            "medium": row[3],
+            "low": row[4]
+        }
+        for spot, row in top
+    ]
+
 
 class AnalyticsService:
     """
@@ -72,11 +143,33 @@ class AnalyticsService:
     - Computing risk metrics
     """
     
-    def __init__(self):
-        """Initialize with phishing service."""
-        self.phishing_service = PhishingService()
+    def __init__(self, phishing_service: PhishingService):
+        """
+        Args:
+            phishing_service: The shared PhishingService to read incidents
+                from, so analytics reuse its cache instead of keeping a copy
+        """
+        self.phishing_service = phishing_service
+        
+        # Aggregates only change when the incidents do, so keep the last one
+        # per incidents version instead of recounting on every request
+        self._memo = CacheService()
         logger.info("AnalyticsService initialized")
     
+    async def _aggregated(self) -> Tuple[List[PhishingIncident], Dict[str, Any]]:
+        """Current incidents and their aggregate, recounted only on a new version."""
+        incidents = await self.phishing_service.get_all_incidents()
+        agg = self._memo.memoize(
+            "analytics:aggregate",
+            self.phishing_service.version,
+            lambda: _aggregate(incidents)
+        )
+        return incidents, agg
+    
+    async def precompute(self) -> None:
+        """Count the current incidents ahead of requests (see PhishingService.precompute)."""
+        await self._aggregated()
+    
     async def get_threat_levels_distribution(self) -> Dict[str, int]:
         """
         Get count of incidents by threat level.
@@ -90,32 +183,18 @@ class AnalyticsService:
             print(distribution)
             # Output: {"critical": 50, "high": 200, "medium": 400, "low": 350}
         """
-        logger.info("Computing threat level distribution...")
+        logger.debug("Computing threat level distribution...")
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
-            
-            distribution = {
-                'critical': 0,
-                'high': 0,
-                'elevated': 0,
-                'moderate': 0,
-                'low': 0,
-                'none': 0,
-                'unknown': 0,
-            }
-            
-            for incident in incidents:
-                level = incident.threat_level.lower()
-                if level in distribution:
-                    distribution[level] += 1
+            _, agg = await self._aggregated()
+            distribution = agg["distribution"]
             
-            logger.info(f"✓ Threat distribution: {distribution}")
+            logger.debug("✓ Threat distribution: %s", distribution)
             return distribution
             
         except Exception as e:
-            logger.error(f"✗ Error computing threat distribution: {e}")
-            raise
+            logger.error("✗ Error computing threat distribution: %s", e)
+            raise as_service_error("Could not compute threat distribution", e)
     
     async def get_top_threat_regions(self, limit: int = 10) -> List[Tuple[str, int]]:
         """
@@ -133,26 +212,20 @@ class AnalyticsService:
             for country, count in regions:
                 print(f"{country}: {count} incidents")
         """
-        logger.info(f"Computing top {limit} threat regions...")
+        logger.debug("Computing top %s threat regions...", limit)
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
-            
-            # Count incidents by country
-            country_counts = Counter()
-            for incident in incidents:
-                if incident.country:
-                    country_counts[incident.country] += 1
+            _, agg = await self._aggregated()
             
             # Get top N
-            top_regions = country_counts.most_common(limit)
+            top_regions = agg["countries"].most_common(limit)
             
-            logger.info(f"✓ Top regions: {top_regions}")
+            logger.debug("✓ Top regions: %s", top_regions)
             return top_regions
             
         except Exception as e:
-            logger.error(f"✗ Error computing top regions: {e}")
-            raise
+            logger.error("✗ Error computing top regions: %s", e)
+            raise as_service_error("Could not compute top threat regions", e)
     
     async def get_most_targeted_companies(self, limit: int = 10) -> List[Tuple[str, int]]:
         """
@@ -170,26 +243,20 @@ class AnalyticsService:
             for company, count in companies:
                 print(f"{company}: {count} phishing attempts")
         """
-        logger.info(f"Computing top {limit} targeted companies...")
+        logger.debug("Computing top %s targeted companies...", limit)
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
-            
-            # Count incidents by company
-            company_counts = Counter()
-            for incident in incidents:
-                if incident.company:
-                    company_counts[incident.company] += 1
+            _, agg = await self._aggregated()
             
             # Get top N
-            top_companies = company_counts.most_common(limit)
+            top_companies = agg["companies"].most_common(limit)
             
-            logger.info(f"✓ Top companies: {top_companies}")
+            logger.debug("✓ Top companies: %s", top_companies)
             return top_companies
             
         except Exception as e:
-            logger.error(f"✗ Error computing top companies: {e}")
-            raise
+            logger.error("✗ Error computing top companies: %s", e)
+            raise as_service_error("Could not compute most targeted companies", e)
     
     async def get_threat_hotspots(self, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -220,45 +287,18 @@ class AnalyticsService:
             for hotspot in hotspots:
                 print(f"{hotspot['country']}: {hotspot['total_incidents']} incidents")
         """
-        logger.info(f"Computing {limit} threat hotspots...")
+        logger.debug("Computing %s threat hotspots...", limit)
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
-            
-            # Group by country and threat level
-            hotspots_dict = {}
+            _, agg = await self._aggregated()
+            hotspots = _top_hotspots(agg["hotspots"], limit)
             
-            for incident in incidents:
-                country = incident.country or "Unknown"
-                threat_level = incident.threat_level.lower()
-                
-                if country not in hotspots_dict:
-                    hotspots_dict[country] = {
-                        "country": country,
-                        "total_incidents": 0,
-                        "critical": 0,
-                        "high": 0,
-                        "medium": 0,
-                        "low": 0
-                    }
-                
-                hotspots_dict[country]["total_incidents"] += 1
-                if threat_level in hotspots_dict[country]:
-                    hotspots_dict[country][threat_level] += 1
-            
-            # Sort by total incidents and limit
-            hotspots = sorted(
-                hotspots_dict.values(),
-                key=lambda x: x["total_incidents"],
-                reverse=True
-            )[:limit]
-            
-            logger.info(f"✓ Identified {len(hotspots)} threat hotspots")
+            logger.debug("✓ Identified %d threat hotspots", len(hotspots))
             return hotspots
             
         except Exception as e:
-            logger.error(f"✗ Error computing hotspots: {e}")
-            raise
+            logger.error("✗ Error computing hotspots: %s", e)
+            raise as_service_error("Could not compute threat hotspots", e)
     
     async def get_isp_threat_rankings(self, limit: int = 10) -> List[Tuple[str, int]]:
         """
@@ -278,26 +318,20 @@ class AnalyticsService:
             for isp, count in isps:
                 print(f"{isp}: {count} phishing attempts")
         """
-        logger.info(f"Computing top {limit} ISP threat rankings...")
+        logger.debug("Computing top %s ISP threat rankings...", limit)
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
-            
-            # Count incidents by ISP
-            isp_counts = Counter()
-            for incident in incidents:
-                if incident.isp:
-                    isp_counts[incident.isp] += 1
+            _, agg = await self._aggregated()
             
             # Get top N
-            top_isps = isp_counts.most_common(limit)
+            top_isps = agg["isps"].most_common(limit)
             
-            logger.info(f"✓ Top ISPs: {top_isps}")
+            logger.debug("✓ Top ISPs: %s", top_isps)
             return top_isps
             
         except Exception as e:
-            logger.error(f"✗ Error computing ISP rankings: {e}")
-            raise
+            logger.error("✗ Error computing ISP rankings: %s", e)
+            raise as_service_error("Could not compute ISP rankings", e)
     
     async def get_threat_overview(self) -> Dict[str, Any]:
         """
@@ -318,24 +352,25 @@ class AnalyticsService:
             overview = await analytics.get_threat_overview()
             print(f"Total threats: {overview['total_incidents']}")
         """
-        logger.info("Generating comprehensive threat overview...")
+        logger.debug("Generating comprehensive threat overview...")
         
         try:
-            incidents = await self.phishing_service.get_all_incidents()
+            # One fetch and one (memoized) pass feed every section of the overview
+            incidents, agg = await self._aggregated()
             
             overview = {
                 "total_incidents": len(incidents),
-                "threat_distribution": await self.get_threat_levels_distribution(),
-                "top_regions": await self.get_top_threat_regions(limit=5),
-                "top_companies": await self.get_most_targeted_companies(limit=5),
-                "top_isps": await self.get_isp_threat_rankings(limit=5),
-                "hotspots": await self.get_threat_hotspots(limit=10),
+                "threat_distribution": agg["distribution"],
+                "top_regions": agg["countries"].most_common(5),
+                "top_companies": agg["companies"].most_common(5),
+                "top_isps": agg["isps"].most_common(5),
+                "hotspots": _top_hotspots(agg["hotspots"], 10),
                 "last_updated": datetime.now().isoformat()
             }
             
-            logger.info(f"✓ Threat overview generated")
+            logger.debug("✓ Threat overview generated")
             return overview
             
         except Exception as e:
-            logger.error(f"✗ Error generating overview: {e}")
-            raise
+            logger.error("✗ Error generating overview: %s", e)
+            raise as_service_error("Could not generate threat overview", e)
@@ -8,10 +8,12 @@ WHAT THIS FILE DOES:
 - Stores API responses in memory with timestamps
 - Checks if cached data is still "fresh" (< CACHE_TIMEOUT_MINUTES old)
 - Prevents unnecessary API calls (respects 20 calls/minute limit)
-- Simple in-memory cache (can be upgraded to Redis later)
+- Simple in-memory cache; create_cache() can swap in Redis
+  (services/redis_cache.py) so several workers share one copy
+- Bounded: past CACHE_MAX_ENTRIES keys, the least recently used is evicted
 
 WHAT IT CONNECTS TO:
-- config.py: Uses CACHE_TIMEOUT_MINUTES setting
+- config.py: Uses CACHE_TIMEOUT_MINUTES and CACHE_MAX_ENTRIES settings
 - api_client.py: Checks/stores cached data before hitting the API
 - services/phishing_service.py: May check cache status
 
@@ -39,13 +41,21 @@ HOW TO USE:
     # Check if data is fresh (< 5 minutes old)
     if cache.is_expired("phishing_incidents", 5):
         print("Data is stale, need to refresh")
+    
+    # On the event loop, use the a-prefixed twins (aget, aget_entry, aset, ...)
+    entry = await cache.aget_entry("phishing_incidents")
 
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-from typing import Any, Optional, Dict
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+import time
+
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -60,9 +70,92 @@ class CacheService:
     multiple backend instances.
     """
     
-    def __init__(self):
-        """Initialize the cache storage."""
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        Initialize the cache storage.
+        
+        Args:
+            maxsize: Most keys kept at once (default CACHE_MAX_ENTRIES).
+                Expired entries are NOT dropped on their own: callers decide
+                freshness, and stale values still serve as fallbacks.
+        """
+        self.maxsize = maxsize if maxsize is not None else config.CACHE_MAX_ENTRIES
+        # Insertion order doubles as recency order: most recently used last
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    # Ages are measured on a monotonic clock: cheaper to read and subtract
+    # than datetime.now(), and immune to NTP/DST wall-clock jumps.
+    # A backend shared across hosts overrides this with time.time.
+    _clock = staticmethod(time.monotonic)
+    
+    # ──────────────────────────────────────────────────────────────────────
+    # STORAGE HOOKS
+    # Every public method goes through these five, so a shared backend
+    # (services/redis_cache.py) only has to override them.
+    # ──────────────────────────────────────────────────────────────────────
+    def _entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored entry for key (marking it recently used), or None."""
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        return entry
+    
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        """Insert an entry as most recently used, evicting the oldest past maxsize."""
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            evicted, _ = self._cache.popitem(last=False)
+            logger.debug("✗ Evicted least recently used cache key: '%s'", evicted)
+    
+    def _delete(self, key: str) -> bool:
+        """Remove key; True if it was there."""
+        return self._cache.pop(key, None) is not None
+    
+    def _entries(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Every (key, entry) pair, without changing recency."""
+        return iter(list(self._cache.items()))
+    
+    def _clear_all(self) -> None:
+        """Remove every entry."""
+        self._cache.clear()
+    
+    # ──────────────────────────────────────────────────────────────────────
+    # ASYNC ACCESS
+    # For callers on the event loop. The in-memory hooks never block, so
+    # these just call the sync methods; a backend whose hooks do network I/O
+    # sets _blocking_io and they run in a worker thread instead.
+    # ──────────────────────────────────────────────────────────────────────
+    _blocking_io = False
+    
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        if self._blocking_io:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() without blocking the event loop."""
+        return await self._call(self.get, key)
+    
+    async def aget_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """get_entry() without blocking the event loop."""
+        return await self._call(self.get_entry, key)
+    
+    async def aage_seconds(self, key: str) -> Optional[float]:
+        """age_seconds() without blocking the event loop."""
+        return await self._call(self.age_seconds, key)
+    
+    async def aset(self, key: str, value: Any) -> None:
+        """set() without blocking the event loop."""
+        await self._call(self.set, key, value)
+    
+    async def atouch(self, key: str) -> None:
+        """touch() without blocking the event loop."""
+        await self._call(self.touch, key)
+    
+    async def aclear(self, key: Optional[str] = None) -> None:
+        """clear() without blocking the event loop."""
+        await self._call(self.clear, key)
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -75,11 +168,14 @@ class CacheService:
         Example:
             cache.set("phishing_incidents", [{"id": 1, ...}, {"id": 2, ...}])
         """
-        self._cache[key] = {
+        now = self._clock()
+        # "stored" marks when the value was written; touch() moves only "t"
+        self._store(key, {
             "value": value,
-            "timestamp": datetime.now()
-        }
-        logger.info(f"✓ Cached '{key}' at {self._cache[key]['timestamp']}")
+            "t": now,
+            "stored": now
+        })
+        logger.debug("✓ Cached '%s'", key)
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -98,11 +194,34 @@ class CacheService:
             if data:
                 print(f"Found {len(data)} cached incidents")
         """
-        if key in self._cache:
-            return self._cache[key]["value"]
-        logger.warning(f"✗ Cache miss for key: '{key}'")
+        entry = self._entry(key)
+        if entry is not None:
+            return entry["value"]
+        logger.debug("✗ Cache miss for key: '%s'", key)
         return None
     
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The whole cached entry in one lookup.
+        
+        For callers that need the value AND its age (one round trip instead
+        of two on a shared backend).
+        
+        Returns:
+            {"value": ..., "t": float, "stored": float} (readings of this
+            cache's clock), or None if the key is not cached
+        
+        Example:
+            entry = cache.get_entry("phishing_incidents")
+            if entry:
+                age = cache.entry_age(entry)
+        """
+        return self._entry(key)
+    
+    def entry_age(self, entry: Dict[str, Any]) -> float:
+        """Seconds since an entry from get_entry() was stored or touched."""
+        return self._clock() - entry["t"]
+    
     def is_expired(self, key: str, timeout_minutes: int) -> bool:
         """
         Check if cached data is stale (older than timeout_minutes).
@@ -121,22 +240,90 @@ class CacheService:
             else:
                 print("Cached data is still fresh, use it")
         """
-        if key not in self._cache:
-            logger.warning(f"✗ Key not in cache: '{key}'")
+        entry = self._entry(key)
+        if entry is None:
+            logger.debug("✗ Key not in cache: '%s'", key)
             return True
         
-        cached_time = self._cache[key]["timestamp"]
-        age_minutes = (datetime.now() - cached_time).total_seconds() / 60
+        age_minutes = self.entry_age(entry) / 60
         
         is_stale = age_minutes > timeout_minutes
         
         if is_stale:
-            logger.info(f"✗ Cache expired: '{key}' is {age_minutes:.1f}min old (timeout={timeout_minutes}min)")
+            logger.debug("✗ Cache expired: '%s' is %.1fmin old (timeout=%smin)", key, age_minutes, timeout_minutes)
         else:
-            logger.info(f"✓ Cache fresh: '{key}' is {age_minutes:.1f}min old (timeout={timeout_minutes}min)")
+            logger.debug("✓ Cache fresh: '%s' is %.1fmin old (timeout=%smin)", key, age_minutes, timeout_minutes)
         
         return is_stale
     
+    def age_seconds(self, key: str) -> Optional[float]:
+        """
+        How long ago a key was cached.
+        
+        Args:
+            key: Cache key to check
+        
+        Returns:
+            Age in seconds, or None if the key is not cached
+        
+        Example:
+            age = cache.age_seconds("phishing_incidents")
+            if age is not None and age < 300:
+                print("Cached less than 5 minutes ago")
+        """
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        return self.entry_age(entry)
+    
+    def touch(self, key: str) -> None:
+        """
+        Reset a key's timestamp without replacing its value.
+        
+        Used when the upstream confirms the cached data is still current
+        (HTTP 304), so the TTL restarts without re-storing anything.
+        
+        Args:
+            key: Cache key to refresh
+        
+        Example:
+            cache.touch("phishing_incidents")
+        """
+        entry = self._entry(key)
+        if entry is not None:
+            entry["t"] = self._clock()
+            self._store(key, entry)
+    
+    def memoize(self, key: str, version: Any, compute: Callable[[], Any]) -> Any:
+        """
+        Return the value cached for this version, computing it on a miss.
+        
+        The entry is tagged with the version it was computed for; a different
+        version recomputes and replaces it, so stale results never pile up.
+        
+        Args:
+            key: Cache key for the derived value
+            version: Version of the source data the value depends on
+            compute: Zero-argument callable producing the value
+        
+        Returns:
+            The cached or freshly computed value
+        
+        Example:
+            stats = cache.memoize("analytics:aggregate", 3, lambda: tally(rows))
+        """
+        entry = self._entry(key)
+        if entry is not None and entry.get("version") == version:
+            return entry["value"]
+        
+        value = compute()
+        self._store(key, {
+            "value": value,
+            "t": self._clock(),
+            "version": version
+        })
+        return value
+    
     def clear(self, key: Optional[str] = None) -> None:
         """
         Clear cache entries.
@@ -149,12 +336,11 @@ class CacheService:
             cache.clear()  # Clear everything
         """
         if key:
-            if key in self._cache:
-                del self._cache[key]
-                logger.info(f"✓ Cleared cache key: '{key}'")
+            if self._delete(key):
+                logger.info("✓ Cleared cache key: '%s'", key)
         else:
-            self._cache.clear()
-            logger.info(f"✓ Cleared entire cache")
+            self._clear_all()
+            logger.info("✓ Cleared entire cache")
     
     def get_cache_info(self) -> Dict[str, Any]:
         """
@@ -177,11 +363,14 @@ class CacheService:
             # }
         """
         info = {}
-        now = datetime.now()
+        now = self._clock()
+        wall_now = datetime.now()
         
-        for key, data in self._cache.items():
-            timestamp = data["timestamp"]
-            age_minutes = (now - timestamp).total_seconds() / 60
+        for key, data in self._entries():
+            age = now - data["t"]
+            # Wall-clock time only for display, derived from the monotonic age
+            timestamp = wall_now - timedelta(seconds=age)
+            age_minutes = age / 60
             value = data["value"]
             
             # Estimate size
@@ -194,3 +383,26 @@ class CacheService:
             }
         
         return info
+
+
+def create_cache(ttl_seconds: int, prefix: str = "phishnheat:cache:") -> CacheService:
+    """
+    The cache for data every worker process should share.
+    
+    CACHE_BACKEND=redis stores entries in Redis at REDIS_URL (expiring after
+    ttl_seconds); anything else keeps the per-process in-memory cache.
+    Values must then be JSON-serializable.
+    
+    Args:
+        ttl_seconds: How long Redis keeps an entry; should cover the freshness
+            window plus any stale-fallback window the caller relies on
+        prefix: Redis key namespace; give each cache its own, since clear()
+            removes everything under it
+    
+    Example:
+        cache = create_cache(ttl_seconds=600)
+    """
+    if config.CACHE_BACKEND == "redis":
+        from services.redis_cache import RedisCacheService
+        return RedisCacheService(config.REDIS_URL, ttl_seconds=ttl_seconds, prefix=prefix)
+    return CacheService()
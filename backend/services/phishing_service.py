@@ -17,6 +17,7 @@ WHAT IT CONNECTS TO:
 - D1: populated/read by data-extraction-worker; Python services use api_client only
 - routes/phishing.py: Called by routes to fetch/filter data
 - config.py: Uses validation limits
+- errors.py: Failures surface as ServiceError (a 500 with a safe message)
 
 ARCHITECTURE:
     Frontend calls: GET /api/phishing/heatmap?threat_level=high
@@ -55,18 +56,33 @@ HOW TO USE:
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
+import asyncio
+import base64
+import binascii
 import logging
-from typing import List, Optional
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
+import orjson
 from pydantic import ValidationError
 
 from api_client import PhishStatsClient
-from models import PhishingIncident, HeatmapData, ThreatStatistics, MapPoint
+from models import PhishingIncident, HeatmapData, ThreatStatistics, MapPoint, canonical_threat_level, validate_incidents
 from config import config
+from errors import as_service_error
+from services.cache_service import CacheService
 
 logger = logging.getLogger(__name__)
 
+# Fields get_filtered_incidents() can filter on (see _filter_index)
+_FILTER_FIELDS = ("threat_level", "company", "country", "isp")
+
 _THREAT_INTENSITY = {
     "critical": 10, "high": 8, "elevated": 6, "moderate": 4,
     "low": 2, "none": 1, "unknown": 4,
@@ -115,6 +131,101 @@ def _incident_to_map_point(incident: PhishingIncident) -> Optional[MapPoint]:
         return None
 
 
+def encode_cursor(incident_id: int) -> str:
+    """Opaque page cursor pointing just past the incident with this id."""
+    return base64.urlsafe_b64encode(str(incident_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Incident id inside a cursor from encode_cursor().
+    
+    Raises:
+        ValueError: If the cursor is not one this service issued
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def _heatmap_points(
+    incidents: List[PhishingIncident],
+    threat_level: Optional[str],
+    limit: int
+) -> Tuple[List[List[float]], bytes, int]:
+    """
+    Heatmap points in both wire formats.
+    
+    Args:
+        incidents: All validated incidents
+        threat_level: Lower-cased threat level to keep, or None for all
+        limit: Keep at most this many incidents (after filtering)
+    
+    Returns:
+        ([[lat, lon], ...], packed float32 lat-column + lon-column bytes, incident count)
+    """
+    if threat_level:
+        incidents = [inc for inc in incidents if inc.threat_level == threat_level]
+    incidents = incidents[:limit]
+    
+    coordinates = []
+    lats = array("f")
+    lons = array("f")
+    for inc in incidents:
+        if inc.latitude is not None and inc.longitude is not None:
+            coordinates.append([inc.latitude, inc.longitude])
+            lats.append(inc.latitude)
+            lons.append(inc.longitude)
+    
+    if sys.byteorder != "little":
+        lats.byteswap()
+        lons.byteswap()
+    
+    return coordinates, lats.tobytes() + lons.tobytes(), len(incidents)
+
+
+# Heatmap results kept per incidents version. Their keys come straight from
+# ?threat_level= and ?limit=, so they live in their own small LRU instead of
+# pushing the indexes and statistics out of _memo.
+_HEATMAP_MEMO_ENTRIES = 64
+
+# Quantized heatmap grid: degrees × 100 (0.01° ≈ 1 km) fits int16 (±18000)
+HEATMAP_QUANT_SCALE = 100
+
+
+def _quantized_columns(coordinates: List[List[float]]) -> bytes:
+    """Packed little-endian int16 lat-column + lon-column, in 1/HEATMAP_QUANT_SCALE degrees."""
+    lats = array("h", [round(lat * HEATMAP_QUANT_SCALE) for lat, _ in coordinates])
+    lons = array("h", [round(lon * HEATMAP_QUANT_SCALE) for _, lon in coordinates])
+    if sys.byteorder != "little":
+        lats.byteswap()
+        lons.byteswap()
+    return lats.tobytes() + lons.tobytes()
+
+
+def _threat_tallies(
+    incidents: List[PhishingIncident]
+) -> Tuple[int, Counter, List[str], List[str]]:
+    """
+    (total, threat-level counts, top 5 companies, top 5 countries).
+    
+    Counter tallies each column in C (threat_level is already lower-cased
+    by the model); most_common(5) is a heap selection in the same order
+    as a full sort.
+    """
+    threat_counts = Counter(map(attrgetter("threat_level"), incidents))
+    companies = Counter(filter(None, map(attrgetter("company"), incidents)))
+    countries = Counter(filter(None, map(attrgetter("country"), incidents)))
+    return (
+        len(incidents),
+        threat_counts,
+        [c for c, _ in companies.most_common(5)],
+        [c for c, _ in countries.most_common(5)],
+    )
+
+
 class PhishingService:
     """
     Service layer for phishing incident management.
@@ -129,12 +240,45 @@ class PhishingService:
     def __init__(self):
         """Initialize the service with API client."""
         self.api_client = PhishStatsClient()
+        
+        # (version, validated incidents); kept outside _memo so no amount of
+        # other memoized data can evict it and force a re-validation
+        self._incidents: Optional[Tuple[int, List[PhishingIncident]]] = None
+        # Per-version lookups derived from the incidents (e.g. id → position);
+        # a fixed handful of keys, never keyed by request parameters
+        self._memo = CacheService()
+        # Per-version heatmap points/encodings, one entry per parameter set
+        self._heatmap_memo = CacheService(maxsize=_HEATMAP_MEMO_ENTRIES)
+        # (version, task) of the validation currently running off the loop
+        self._validating: Optional[Tuple[int, asyncio.Future]] = None
         logger.info("PhishingService initialized")
     
+    @property
+    def version(self) -> int:
+        """Incidents version; changes whenever the API client caches new data."""
+        return self.api_client.version
+    
+    async def data_tag(self) -> str:
+        """
+        Tag of the incidents currently served, for HTTP ETags.
+        
+        Makes sure the payload is current first (a cache hit when warm).
+        
+        Example:
+            etag = f'W/"{await service.data_tag()}"'
+        """
+        await self.get_all_incidents()
+        return self.api_client.payload_tag
+    
     async def get_all_incidents(self) -> List[PhishingIncident]:
         """
         Get all phishing incidents from cache or API.
         
+        The raw payload is validated once per incidents version, in a
+        worker thread so the event loop keeps serving other requests;
+        every heatmap/filter/stats request in between reuses the same
+        PhishingIncident objects.
+        
         Returns:
             List of validated PhishingIncident objects
         
@@ -142,27 +286,124 @@ class PhishingService:
             incidents = await service.get_all_incidents()
             print(f"Found {len(incidents)} incidents")
         """
-        logger.info("Fetching all incidents...")
+        logger.debug("Fetching all incidents...")
         
         try:
             # Fetch raw data from API (with caching)
             raw_data = await self.api_client.fetch_incidents()
             
-            # Validate each incident
-            validated_incidents = []
-            for item in raw_data:
-                try:
-                    incident = PhishingIncident(**item)
-                    validated_incidents.append(incident)
-                except Exception as e:
-                    logger.warning(f"Skipping invalid incident: {e}")
+            # An empty payload is never cached upstream, so it has no version
+            if not raw_data:
+                return []
             
-            logger.info(f"✓ Processed {len(validated_incidents)} valid incidents")
-            return validated_incidents
+            return await self._validated(raw_data)
             
         except Exception as e:
-            logger.error(f"✗ Error fetching incidents: {e}")
-            raise
+            logger.error("✗ Error fetching incidents: %s", e)
+            raise as_service_error("Could not fetch phishing incidents", e)
+    
+    async def refresh_incidents(self) -> int:
+        """
+        Re-fetch incidents from PhishStats, bypassing the cache.
+        
+        Returns:
+            Number of raw incidents in the fresh payload
+        
+        Example:
+            count = await service.refresh_incidents()
+        """
+        try:
+            raw_data = await self.api_client.fetch_incidents(force_refresh=True)
+            return len(raw_data)
+            
+        except Exception as e:
+            logger.error("✗ Error refreshing incidents: %s", e)
+            raise as_service_error("Could not refresh phishing incidents", e)
+    
+    async def _validated(self, raw_data: List[Dict[str, Any]]) -> List[PhishingIncident]:
+        """Validated incidents for the current version, validating at most once."""
+        version = self.version
+        if self._incidents is not None and self._incidents[0] == version:
+            return self._incidents[1]
+        
+        # Callers arriving while the thread runs await the same task
+        if self._validating is None or self._validating[0] != version:
+            task = asyncio.ensure_future(asyncio.to_thread(self._validate, raw_data))
+            self._validating = (version, task)
+        try:
+            incidents = await asyncio.shield(self._validating[1])
+        finally:
+            # Finished (or failed) validations are not reused; _incidents has the result
+            if self._validating is not None and self._validating[1].done():
+                self._validating = None
+        
+        # A validation that finished after a newer payload arrived is not kept
+        if version == self.version:
+            self._incidents = (version, incidents)
+        return incidents
+    
+    def _validate(self, raw_data: List[Dict[str, Any]]) -> List[PhishingIncident]:
+        """Validate a raw payload, skipping (and logging) invalid records."""
+        # Validate the whole payload in one batch. A failed batch reports
+        # every bad row (loc[0] is its list index), so drop those and
+        # re-validate the rest in one more batch call.
+        rows = raw_data
+        while True:
+            try:
+                validated_incidents = validate_incidents(rows)
+                break
+            except ValidationError as e:
+                bad: Dict[int, str] = {}
+                for err in e.errors():
+                    bad.setdefault(err["loc"][0], err["msg"])
+                for msg in bad.values():
+                    logger.warning("Skipping invalid incident: %s", msg)
+                rows = [row for i, row in enumerate(rows) if i not in bad]
+        
+        logger.debug("✓ Processed %d valid incidents", len(validated_incidents))
+        return validated_incidents
+    
+    async def precompute(self) -> None:
+        """
+        Build every per-version derivation of the current incidents.
+        
+        Run from main.py's background task so the first request after a
+        new payload finds validation, indexes, statistics and the default
+        heatmap already done. Cheap no-op when nothing changed.
+        """
+        incidents = await self.get_all_incidents()
+        self._positions(incidents)
+        self._filter_index(incidents)
+        await self.get_heatmap_json()
+        await self.get_threat_statistics()
+    
+    async def _heatmap_points(
+        self,
+        threat_level: Optional[str],
+        limit: int
+    ) -> Tuple[List[List[float]], bytes, int]:
+        """Heatmap points for these parameters, computed once per incidents version."""
+        incidents = await self.get_all_incidents()
+        level = threat_level.lower() if threat_level else None
+        return self._heatmap_memoize(
+            "heatmap", threat_level, limit,
+            lambda: _heatmap_points(incidents, level, limit)
+        )
+    
+    def _heatmap_memoize(
+        self,
+        kind: str,
+        threat_level: Optional[str],
+        limit: int,
+        compute: Callable[[], Any]
+    ) -> Any:
+        """compute() memoized per version in the heatmap LRU, keyed on the canonical level."""
+        level = canonical_threat_level(threat_level) if threat_level else None
+        if threat_level and level is None:
+            # Matches no incident: computed but never cached, so arbitrary
+            # ?threat_level= strings can't take up heatmap entries
+            return compute()
+        return self._heatmap_memo.memoize(f"{kind}:{level}:{limit}", self.version, compute)
     
     async def get_heatmap_data(
         self,
@@ -187,41 +428,151 @@ class PhishingService:
             # heatmap.coordinates = [[40.7128, -74.0060], [51.5074, -0.1278], ...]
             # heatmap.incident_count = 342
         """
-        logger.info(f"Getting heatmap data (threat_level={threat_level}, limit={limit})...")
+        logger.debug("Getting heatmap data (threat_level=%s, limit=%s)...", threat_level, limit)
         
         try:
-            # Get all incidents
-            incidents = await self.get_all_incidents()
-            
-            # Filter by threat level if specified
-            if threat_level:
-                incidents = [
-                    inc for inc in incidents 
-                    if inc.threat_level == threat_level.lower()
-                ]
+            coordinates, _, count = await self._heatmap_points(threat_level, limit)
             
-            # Limit results
-            incidents = incidents[:limit]
-            
-            # Extract coordinates: [[lat, lon], [lat, lon], ...]
-            coordinates = [
-                [inc.latitude, inc.longitude]
-                for inc in incidents
-                if inc.latitude is not None and inc.longitude is not None
-            ]
-            
-            heatmap = HeatmapData(
+            # The points came from validated incidents; skip revalidating them
+            heatmap = HeatmapData.model_construct(
                 coordinates=coordinates,
-                incident_count=len(incidents),
+                incident_count=count,
                 last_updated=datetime.now()
             )
             
-            logger.info(f"✓ Generated heatmap with {len(coordinates)} coordinates")
+            logger.debug("✓ Generated heatmap with %d coordinates", len(coordinates))
             return heatmap
             
         except Exception as e:
-            logger.error(f"✗ Error generating heatmap: {e}")
-            raise
+            logger.error("✗ Error generating heatmap: %s", e)
+            raise as_service_error("Could not generate heatmap data", e)
+    
+    async def get_heatmap_json(
+        self,
+        threat_level: Optional[str] = None,
+        limit: int = 100
+    ) -> bytes:
+        """
+        get_heatmap_data() as ready-to-send HeatmapData JSON bytes.
+        
+        The coordinates array (nearly all of the body) is encoded by
+        orjson once per incidents version; each call only splices in
+        incident_count and a fresh last_updated.
+        
+        Example:
+            body = await service.get_heatmap_json(threat_level="high")
+            # b'{"coordinates":[[40.7128,-74.006],...],"incident_count":342,...}'
+        """
+        coordinates, _, count = await self._heatmap_points(threat_level, limit)
+        coords_json = self._heatmap_memoize(
+            "heatmap_json", threat_level, limit,
+            lambda: orjson.dumps(coordinates)
+        )
+        
+        return b"".join((
+            b'{"coordinates":', coords_json,
+            b',"incident_count":', str(count).encode(),
+            b',"last_updated":', orjson.dumps(datetime.now()),
+            b"}"
+        ))
+    
+    async def get_heatmap_packed(
+        self,
+        threat_level: Optional[str] = None,
+        limit: int = 100,
+        quantize: bool = False
+    ) -> Tuple[bytes, int]:
+        """
+        Heatmap coordinates as packed little-endian float32 columns.
+        
+        Same points as get_heatmap_data(), laid out as all latitudes followed
+        by all longitudes (lat[0..n) || lon[0..n)). Half the bytes of JSON
+        doubles and no per-point list; browsers read it with
+        new Float32Array(await resp.arrayBuffer()).
+        
+        With quantize=True the columns are int16 in 1/HEATMAP_QUANT_SCALE
+        degrees instead (a 0.01° grid, finer than a world map can show),
+        halving the bytes again; divide by HEATMAP_QUANT_SCALE to decode.
+        
+        Args:
+            threat_level: Optional filter (low, medium, high, critical)
+            limit: Maximum number of coordinates to return
+            quantize: Return the int16 grid instead of float32
+        
+        Returns:
+            (payload bytes, incident count)
+        
+        Example:
+            body, count = await service.get_heatmap_packed(limit=500)
+            # len(body) == 8 * number_of_points
+        """
+        coordinates, packed, count = await self._heatmap_points(threat_level, limit)
+        
+        if quantize:
+            packed = self._heatmap_memoize(
+                "heatmap_i16", threat_level, limit,
+                lambda: _quantized_columns(coordinates)
+            )
+        
+        logger.debug("✓ Packed heatmap with %d coordinates", len(coordinates))
+        return packed, count
+    
+    def _positions(self, incidents: List[PhishingIncident]) -> Dict[int, int]:
+        """Index of every incident id in the current list, rebuilt once per version."""
+        return self._memo.memoize(
+            "incident_positions",
+            self.version,
+            lambda: {inc.id: i for i, inc in enumerate(incidents) if inc.id is not None}
+        )
+    
+    def _sorted_ids(self, incidents: List[PhishingIncident]) -> Optional[List[int]]:
+        """The id column in list order if it ascends (as PhishStats ids do), else None."""
+        def build() -> Optional[List[int]]:
+            ids = [inc.id for inc in incidents]
+            if None in ids or any(a > b for a, b in zip(ids, ids[1:])):
+                return None
+            return ids
+        
+        return self._memo.memoize("sorted_ids", self.version, build)
+    
+    def _resume_position(self, incidents: List[PhishingIncident], after_id: int) -> int:
+        """
+        List position to continue from after the cursor's incident.
+        
+        A refresh may have dropped that incident; then resume at the first
+        id greater than it, or past the end (an empty last page) if the ids
+        are not in order.
+        """
+        position = self._positions(incidents).get(after_id)
+        if position is not None:
+            return position + 1
+        
+        ids = self._sorted_ids(incidents)
+        if ids is None:
+            return len(incidents)
+        return bisect_right(ids, after_id)
+    
+    def _filter_index(self, incidents: List[PhishingIncident]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Inverted index for get_filtered_incidents(), rebuilt once per version.
+        
+        Returns:
+            {"threat_level": {"high": [0, 4, ...]}, "company": {"paypal": [...]}, ...}
+            Values are lower-cased; positions ascend.
+        """
+        def build() -> Dict[str, Dict[str, List[int]]]:
+            index = {field: defaultdict(list) for field in _FILTER_FIELDS}
+            for i, inc in enumerate(incidents):
+                index["threat_level"][inc.threat_level].append(i)
+                if inc.company:
+                    index["company"][inc.company.lower()].append(i)
+                if inc.country:
+                    index["country"][inc.country.lower()].append(i)
+                if inc.isp:
+                    index["isp"][inc.isp.lower()].append(i)
+            return {field: dict(postings) for field, postings in index.items()}
+        
+        return self._memo.memoize("filter_index", self.version, build)
     
     async def get_filtered_incidents(
         self,
@@ -230,7 +581,8 @@ class PhishingService:
         country: Optional[str] = None,
         isp: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        after_id: Optional[int] = None
     ) -> List[PhishingIncident]:
         """
         Get incidents with multiple filter options.
@@ -241,7 +593,10 @@ class PhishingService:
             country: Filter by country of origin
             isp: Filter by Internet Service Provider
             limit: Maximum results to return
-            offset: Skip this many results (for pagination)
+            offset: Skip this many results (for pagination; prefer after_id)
+            after_id: Resume right after the incident with this id (keyset
+                pagination, see decode_cursor()); still works once a refresh
+                has dropped that incident
         
         Returns:
             Filtered list of PhishingIncident objects
@@ -253,46 +608,55 @@ class PhishingService:
                 limit=50
             )
         """
-        logger.info(f"Filtering incidents: threat={threat_level}, company={company}, country={country}")
+        logger.debug("Filtering incidents: threat=%s, company=%s, country=%s", threat_level, company, country)
         
         try:
             # Get all incidents
             incidents = await self.get_all_incidents()
             
-            # Apply filters
-            if threat_level:
-                incidents = [
-                    inc for inc in incidents 
-                    if inc.threat_level == threat_level.lower()
-                ]
-            
-            if company:
-                incidents = [
-                    inc for inc in incidents 
-                    if inc.company and inc.company.lower() == company.lower()
-                ]
-            
-            if country:
-                incidents = [
-                    inc for inc in incidents 
-                    if inc.country and inc.country.lower() == country.lower()
-                ]
+            # Keyset pagination: jump straight to the row after the cursor
+            start = 0
+            if after_id is not None:
+                start = self._resume_position(incidents, after_id)
             
-            if isp:
-                incidents = [
-                    inc for inc in incidents 
-                    if inc.isp and inc.isp.lower() == isp.lower()
-                ]
+            wanted = {
+                field: value.lower()
+                for field, value in (
+                    ("threat_level", threat_level),
+                    ("company", company),
+                    ("country", country),
+                    ("isp", isp),
+                )
+                if value
+            }
             
-            # Apply pagination
-            incidents = incidents[offset:offset + limit]
+            if wanted:
+                # Posting lists of matching positions; intersect starting
+                # from the most selective, keeping the list's order
+                index = self._filter_index(incidents)
+                postings = sorted(
+                    (index[field].get(value, []) for field, value in wanted.items()),
+                    key=len
+                )
+                positions = postings[0]
+                first = bisect_left(positions, start)
+                if len(postings) > 1:
+                    # Lazily test candidates; stop after the page is full
+                    others = [set(p) for p in postings[1:]]
+                    matches = (i for i in islice(positions, first, None) if all(i in o for o in others))
+                    positions = list(islice(matches, offset, offset + limit))
+                else:
+                    positions = positions[first + offset:first + offset + limit]
+                incidents = [incidents[i] for i in positions]
+            else:
+                incidents = incidents[start + offset:start + offset + limit]
             
-            logger.info(f"✓ Returned {len(incidents)} filtered incidents")
+            logger.debug("✓ Returned %d filtered incidents", len(incidents))
             return incidents
             
         except Exception as e:
-            logger.error(f"✗ Error filtering incidents: {e}")
-            raise
+            logger.error("✗ Error filtering incidents: %s", e)
+            raise as_service_error("Could not filter phishing incidents", e)
 
     async def get_map_points(
         self,
@@ -333,58 +697,32 @@ class PhishingService:
             print(f"Critical threats: {stats.critical_count}")
             print(f"Top targets: {stats.top_targeted_companies}")
         """
-        logger.info("Computing threat statistics...")
+        logger.debug("Computing threat statistics...")
         
         try:
             incidents = await self.get_all_incidents()
-            
-            # Count by threat level
-            threat_counts = {
-                'critical': 0,
-                'high': 0,
-                'elevated': 0,
-                'moderate': 0,
-                'low': 0,
-                'none': 0,
-            }
-            
-            companies = {}
-            countries = {}
-            
-            for incident in incidents:
-                # Count threat levels
-                level = incident.threat_level.lower()
-                if level in threat_counts:
-                    threat_counts[level] += 1
-                
-                # Count companies
-                if incident.company:
-                    companies[incident.company] = companies.get(incident.company, 0) + 1
-                
-                # Count countries
-                if incident.country:
-                    countries[incident.country] = countries.get(incident.country, 0) + 1
-            
-            # Get top 5 for each
-            top_companies = sorted(companies.items(), key=lambda x: x[1], reverse=True)[:5]
-            top_countries = sorted(countries.items(), key=lambda x: x[1], reverse=True)[:5]
+            total, threat_counts, top_companies, top_countries = self._memo.memoize(
+                "threat_statistics",
+                self.version,
+                lambda: _threat_tallies(incidents)
+            )
             
             stats = ThreatStatistics(
-                total_incidents=len(incidents),
+                total_incidents=total,
                 critical_count=threat_counts['critical'],
                 high_count=threat_counts['high'],
                 elevated_count=threat_counts['elevated'],
                 moderate_count=threat_counts['moderate'],
                 low_count=threat_counts['low'],
                 none_count=threat_counts['none'],
-                top_targeted_companies=[c[0] for c in top_companies],
-                most_active_countries=[c[0] for c in top_countries],
+                top_targeted_companies=top_companies,
+                most_active_countries=top_countries,
                 last_updated=datetime.now()
             )
             
-            logger.info(f"✓ Generated threat statistics")
+            logger.debug("✓ Generated threat statistics")
             return stats
             
         except Exception as e:
-            logger.error(f"✗ Error generating statistics: {e}")
-            raise
+            logger.error("✗ Error generating statistics: %s", e)
+            raise as_service_error("Could not compute threat statistics", e)
@@ -0,0 +1,70 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: services/rate_limiter.py
+PURPOSE: Enforce the PhishStats call quota on our side of the wire
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Provides an async token bucket (API_RATE_LIMIT tokens refilled per minute)
+- Makes callers wait for a token instead of letting PhishStats answer 429
+- Allows short bursts up to the bucket size, then spaces calls evenly
+
+WHAT IT CONNECTS TO:
+- config.py: API_RATE_LIMIT (calls per minute)
+- api_client.py: Acquires a token before every upstream request
+
+HOW TO USE:
+    from services.rate_limiter import TokenBucket
+    
+    bucket = TokenBucket(rate_per_min=20, burst=20)
+    await bucket.acquire()  # returns immediately, or sleeps until a token frees up
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+    
+    Tokens refill continuously at rate_per_min / 60 per second up to burst.
+    Each acquire() spends one token, sleeping first if none are available.
+    """
+    
+    def __init__(self, rate_per_min: float, burst: int):
+        """
+        Args:
+            rate_per_min: Sustained calls allowed per minute
+            burst: Maximum tokens the bucket can hold (calls allowed back-to-back)
+        """
+        self.rate_per_sec = rate_per_min / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+    
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill, capped at burst."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate_per_sec)
+        self._last = now
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available, then take it."""
+        while True:
+            self._refill()
+            
+            # No await between the check and the decrement, so concurrent
+            # callers on the event loop can't both take the last token.
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            
+            wait = (1 - self._tokens) / self.rate_per_sec
+            logger.warning("Rate limit reached, waiting %.1fs for a token", wait)
+            await asyncio.sleep(wait)
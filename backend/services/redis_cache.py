@@ -0,0 +1,173 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+FILE: services/redis_cache.py
+PURPOSE: Redis-backed CacheService shared by every worker process
+═══════════════════════════════════════════════════════════════════════════════
+
+WHAT THIS FILE DOES:
+- Stores CacheService entries ({"value", "t", "stored"}) in Redis
+  instead of a per-process dict
+- Lets `uvicorn --workers N` / gunicorn share ONE copy of the PhishStats data,
+  so the 20 calls/minute budget isn't spent N times over
+- Expires keys server-side (SETEX) once they are past any use
+- Keeps the last decoded value of each key in process, so a read whose
+  "stored" stamp hasn't changed fetches and decodes only the small metadata
+
+WHAT IT CONNECTS TO:
+- services/cache_service.py: Subclasses CacheService; create_cache() picks it
+  when CACHE_BACKEND=redis
+- config.py: REDIS_URL, CACHE_BACKEND
+- middleware/response_cache.py: Recorded endpoint responses, under their
+  own prefix ("phishnheat:responses:")
+- redis (optional dependency): `pip install redis`
+
+ARCHITECTURE:
+    api_client.py (worker 1) ─┐
+    api_client.py (worker 2) ─┼─→ RedisCacheService (THIS FILE) ─→ Redis
+    api_client.py (worker N) ─┘
+
+    Only the storage hooks and the clock are overridden; freshness, touch()
+    and memoize() behave exactly as in the in-memory cache. Entries are
+    stamped with time.time() because a monotonic clock means nothing to
+    another host.
+
+    Each entry is two keys, written together in one MULTI:
+        <prefix>meta:<key>  {"t", "stored", "version"}   (orjson, tiny)
+        <prefix>data:<key>  the value                    (orjson)
+    touch() rewrites only the meta key. Values must be JSON-serializable;
+    orjson (unlike pickle) can't run code when a poisoned key is read.
+
+    The hooks block on the network, so async callers use the a-prefixed
+    methods (aget_entry, aset, ...), which run them in a worker thread.
+
+HOW TO USE:
+    # .env
+    CACHE_BACKEND=redis
+    REDIS_URL=redis://localhost:6379/0
+
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import orjson
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for CACHE_BACKEND=redis
+    redis = None
+
+from services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCacheService(CacheService):
+    """
+    CacheService whose entries live in Redis under a key prefix.
+    
+    Uses the synchronous (thread-safe, pooled) client; _blocking_io makes
+    the async methods run it off the event loop via asyncio.to_thread.
+    """
+    
+    _clock = staticmethod(time.time)
+    _blocking_io = True
+    
+    def __init__(
+        self,
+        url: str,
+        ttl_seconds: int,
+        prefix: str = "phishnheat:cache:",
+        client: Optional[Any] = None
+    ):
+        """
+        Args:
+            url: Redis connection URL (e.g. "redis://localhost:6379/0")
+            ttl_seconds: Redis expiry for every stored entry
+            prefix: Namespace for this cache's keys
+            client: Redis client to use instead of connecting to url
+    
+        Raises:
+            RuntimeError: If the redis package is not installed
+        """
+        if client is None:
+            if redis is None:
+                raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package (pip install redis)")
+            client = redis.Redis.from_url(url)
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._meta_prefix = prefix + "meta:"
+        self._data_prefix = prefix + "data:"
+        self._redis = client
+        # key -> (stamp, decoded value) of the last value read or written here
+        self._decoded: "OrderedDict[str, Tuple[Tuple[Any, Any], Any]]" = OrderedDict()
+        # The hooks run in worker threads (see _blocking_io)
+        self._decoded_lock = threading.Lock()
+        logger.info("RedisCacheService initialized | prefix=%s ttl=%ss", prefix, ttl_seconds)
+    
+    @staticmethod
+    def _stamp(meta: Dict[str, Any]) -> Tuple[Any, Any]:
+        """What identifies a value: set() writes "stored", memoize() "version"."""
+        return meta.get("stored"), meta.get("version")
+    
+    def _remember(self, key: str, stamp: Tuple[Any, Any], value: Any) -> None:
+        with self._decoded_lock:
+            self._decoded[key] = (stamp, value)
+            self._decoded.move_to_end(key)
+            while len(self._decoded) > self.maxsize:
+                self._decoded.popitem(last=False)
+    
+    def _entry(self, key: str) -> Optional[Dict[str, Any]]:
+        raw_meta = self._redis.get(self._meta_prefix + key)
+        if raw_meta is None:
+            return None
+        meta = orjson.loads(raw_meta)
+        
+        local = self._decoded.get(key)
+        if local is not None and local[0] == self._stamp(meta):
+            return {**meta, "value": local[1]}
+        
+        # Read meta and value together so they belong to the same write
+        raw_meta, raw_value = self._redis.mget(self._meta_prefix + key, self._data_prefix + key)
+        if raw_meta is None or raw_value is None:
+            return None
+        meta = orjson.loads(raw_meta)
+        value = orjson.loads(raw_value)
+        self._remember(key, self._stamp(meta), value)
+        return {**meta, "value": value}
+    
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        meta = {name: field for name, field in entry.items() if name != "value"}
+        stamp = self._stamp(meta)
+        local = self._decoded.get(key)
+        with self._redis.pipeline() as pipe:
+            pipe.setex(self._meta_prefix + key, self.ttl_seconds, orjson.dumps(meta))
+            if local is not None and local[0] == stamp and local[1] is entry["value"]:
+                # touch(): same value, only the timestamps and expiry move
+                pipe.expire(self._data_prefix + key, self.ttl_seconds)
+            else:
+                pipe.setex(self._data_prefix + key, self.ttl_seconds, orjson.dumps(entry["value"]))
+            pipe.execute()
+        self._remember(key, stamp, entry["value"])
+    
+    def _delete(self, key: str) -> bool:
+        self._decoded.pop(key, None)
+        return bool(self._redis.delete(self._meta_prefix + key, self._data_prefix + key))
+    
+    def _entries(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for name in self._redis.scan_iter(match=self._meta_prefix + "*"):
+            key = name.decode()[len(self._meta_prefix):]
+            entry = self._entry(key)
+            if entry is not None:
+                yield key, entry
+    
+    def _clear_all(self) -> None:
+        self._decoded.clear()
+        names = list(self._redis.scan_iter(match=self.prefix + "*"))
+        if names:
+            self._redis.delete(*names)
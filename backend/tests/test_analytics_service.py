@@ -1,11 +1,13 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
+import services.analytics_service as analytics_module
 from services.analytics_service import AnalyticsService
+from services.phishing_service import PhishingService
 
 
 @pytest.fixture
 def analytics(sample_incidents):
-    svc = AnalyticsService()
+    svc = AnalyticsService(PhishingService())
     svc.phishing_service.get_all_incidents = AsyncMock(return_value=sample_incidents)
     return svc
 
@@ -27,7 +29,7 @@ class TestGetThreatLevelsDistribution:
         assert set(dist.keys()) == expected_keys
 
     async def test_empty_incidents_all_zeros(self):
-        svc = AnalyticsService()
+        svc = AnalyticsService(PhishingService())
         svc.phishing_service.get_all_incidents = AsyncMock(return_value=[])
         dist = await svc.get_threat_levels_distribution()
         assert all(v == 0 for v in dist.values())
@@ -51,7 +53,7 @@ class TestGetTopThreatRegions:
             assert isinstance(entry[1], int)
 
     async def test_empty_incidents_returns_empty(self):
-        svc = AnalyticsService()
+        svc = AnalyticsService(PhishingService())
         svc.phishing_service.get_all_incidents = AsyncMock(return_value=[])
         regions = await svc.get_top_threat_regions()
         assert regions == []
@@ -61,7 +63,7 @@ class TestGetTopThreatRegions:
         no_country = PhishingIncident(
             url="http://x.com", latitude=0.0, longitude=0.0, threat_level="low"
         )
-        svc = AnalyticsService()
+        svc = AnalyticsService(PhishingService())
         svc.phishing_service.get_all_incidents = AsyncMock(return_value=sample_incidents + [no_country])
         regions = await svc.get_top_threat_regions()
         countries = [c for c, _ in regions]
@@ -84,7 +86,7 @@ class TestGetMostTargetedCompanies:
         assert len(companies) == 1
 
     async def test_empty_incidents_returns_empty(self):
-        svc = AnalyticsService()
+        svc = AnalyticsService(PhishingService())
         svc.phishing_service.get_all_incidents = AsyncMock(return_value=[])
         companies = await svc.get_most_targeted_companies()
         assert companies == []
@@ -119,6 +121,13 @@ class TestGetThreatHotspots:
         assert us_hotspot["total_incidents"] == 1
 
 
+    async def test_rows_are_fresh_dicts_per_call(self, analytics):
+        first = await analytics.get_threat_hotspots(limit=5)
+        first[0]["total_incidents"] = -1
+        second = await analytics.get_threat_hotspots(limit=5)
+        assert second[0]["total_incidents"] > 0
+
+
 class TestGetIspThreatRankings:
     async def test_sorted_by_count(self, analytics):
         isps = await analytics.get_isp_threat_rankings()
@@ -135,7 +144,7 @@ class TestGetIspThreatRankings:
         assert len(isps) == 1
 
     async def test_empty_incidents_returns_empty(self):
-        svc = AnalyticsService()
+        svc = AnalyticsService(PhishingService())
         svc.phishing_service.get_all_incidents = AsyncMock(return_value=[])
         isps = await svc.get_isp_threat_rankings()
         assert isps == []
@@ -163,3 +172,31 @@ class TestGetThreatOverview:
         dist = overview["threat_distribution"]
         assert dist["critical"] == 2
         assert dist["high"] == 1
+
+    async def test_fetches_incidents_once(self, analytics):
+        await analytics.get_threat_overview()
+        assert analytics.phishing_service.get_all_incidents.await_count == 1
+
+    async def test_sections_match_individual_methods(self, analytics):
+        overview = await analytics.get_threat_overview()
+        assert overview["threat_distribution"] == await analytics.get_threat_levels_distribution()
+        assert overview["top_regions"] == await analytics.get_top_threat_regions(limit=5)
+        assert overview["top_companies"] == await analytics.get_most_targeted_companies(limit=5)
+        assert overview["top_isps"] == await analytics.get_isp_threat_rankings(limit=5)
+        assert overview["hotspots"] == await analytics.get_threat_hotspots(limit=10)
+
+
+class TestAggregateMemo:
+    async def test_same_version_aggregates_once(self, analytics):
+        with patch.object(analytics_module, "_aggregate", wraps=analytics_module._aggregate) as agg:
+            await analytics.get_threat_levels_distribution()
+            await analytics.get_top_threat_regions()
+            await analytics.get_threat_overview()
+        assert agg.call_count == 1
+
+    async def test_new_version_recounts(self, analytics, sample_incidents):
+        await analytics.get_threat_levels_distribution()
+        analytics.phishing_service.get_all_incidents = AsyncMock(return_value=sample_incidents[:1])
+        analytics.phishing_service.api_client.version += 1
+        overview = await analytics.get_threat_overview()
+        assert sum(overview["threat_distribution"].values()) == 1
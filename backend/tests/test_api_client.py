@@ -1,6 +1,11 @@
+import asyncio
+import dataclasses
 import pytest
 import httpx
+import orjson
+from datetime import timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
+import api_client
 from api_client import PhishStatsClient
 
 
@@ -23,10 +28,12 @@ def raw_incident():
     }
 
 
-def _make_httpx_mock(json_data):
-    """Build a mock that mimics async with httpx.AsyncClient() as c: await c.get(...)"""
+def _make_httpx_mock(json_data, status_code=200, headers=None):
+    """Build a mock that stands in for the client's shared httpx.AsyncClient."""
     mock_response = MagicMock()
-    mock_response.json.return_value = json_data
+    mock_response.status_code = status_code
+    mock_response.headers = headers or {}
+    mock_response.content = orjson.dumps(json_data)
     mock_response.raise_for_status = MagicMock()
 
     mock_httpx = AsyncMock()
@@ -68,6 +75,40 @@ class TestValidateCoordinates:
         assert client.validate_coordinates(0.0, 180.0) is True
 
 
+class TestSlimRecords:
+    def test_keeps_only_known_fields(self, client, raw_incident):
+        record = {**raw_incident, "screenshot": "http://x/y.png", "page_text": "..."}
+        result = client._slim_records([record])
+        assert result == [raw_incident]
+
+    def test_drops_missing_coordinates(self, client, raw_incident):
+        record = {**raw_incident}
+        del record["latitude"]
+        assert client._slim_records([record, {**raw_incident, "longitude": None}]) == []
+
+    def test_drops_out_of_range_coordinates(self, client, raw_incident):
+        record = {**raw_incident, "latitude": 123.0}
+        assert client._slim_records([record]) == []
+
+    def test_drops_non_numeric_coordinates(self, client, raw_incident):
+        record = {**raw_incident, "latitude": "north"}
+        assert client._slim_records([record]) == []
+
+    def test_drops_nan_coordinates(self, client, raw_incident):
+        record = {**raw_incident, "longitude": "nan"}
+        assert client._slim_records([record]) == []
+
+    def test_keeps_boundary_coordinates(self, client, raw_incident):
+        record = {**raw_incident, "latitude": -90.0, "longitude": 180.0}
+        assert len(client._slim_records([record])) == 1
+
+    def test_interns_repeated_strings(self, client, raw_incident):
+        a = {**raw_incident, "country": "".join(["United ", "States"])}
+        b = {**raw_incident, "country": "".join(["United", " States"])}
+        first, second = client._slim_records([a, b])
+        assert first["country"] is second["country"]
+
+
 class TestFetchIncidentsCaching:
     async def test_returns_cached_data_when_fresh(self, client, raw_incident):
         client.cache.set("phishing_incidents", [raw_incident])
@@ -118,6 +159,95 @@ class TestFetchIncidentsCaching:
         assert result == []
 
 
+class TestFetchIncidentsStaleWhileRevalidate:
+    def _age_cache(self, client, seconds):
+        client.cache._cache["phishing_incidents"]["t"] -= timedelta(seconds=seconds).total_seconds()
+
+    async def test_stale_data_returned_without_waiting(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        self._age_cache(client, client.cache_timeout * 60 + 1)
+        fresh = [{**raw_incident, "id": 2}]
+
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock, return_value=fresh
+        ) as mock_api:
+            result = await client.fetch_incidents()
+            assert result == [raw_incident]
+            await client._inflight
+
+        mock_api.assert_called_once()
+        assert client.cache.get("phishing_incidents") == fresh
+
+    async def test_data_past_stale_window_blocks_on_fetch(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        self._age_cache(client, client.cache_timeout * 60 + client.stale_window + 1)
+        fresh = [{**raw_incident, "id": 2}]
+
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock, return_value=fresh
+        ):
+            result = await client.fetch_incidents()
+
+        assert result == fresh
+
+    async def test_background_refresh_failure_keeps_stale_data(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        self._age_cache(client, client.cache_timeout * 60 + 1)
+
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock,
+            side_effect=Exception("upstream down"),
+        ):
+            result = await client.fetch_incidents()
+            await asyncio.gather(client._inflight, return_exceptions=True)
+
+        assert result == [raw_incident]
+        assert client.cache.get("phishing_incidents") == [raw_incident]
+
+
+class TestFetchIncidentsSingleFlight:
+    async def test_concurrent_misses_share_one_upstream_call(self, client, raw_incident):
+        release = asyncio.Event()
+
+        async def slow_fetch(**kwargs):
+            await release.wait()
+            return [raw_incident]
+
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock, side_effect=slow_fetch
+        ) as mock_api:
+            pending = [asyncio.create_task(client.fetch_incidents()) for _ in range(5)]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*pending)
+
+        mock_api.assert_called_once()
+        assert all(r == [raw_incident] for r in results)
+
+    async def test_inflight_cleared_after_fetch(self, client, raw_incident):
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock, return_value=[raw_incident]
+        ):
+            await client.fetch_incidents()
+        await asyncio.sleep(0)
+
+        assert client._inflight is None
+
+    async def test_failure_propagates_to_all_waiters(self, client):
+        async def failing_fetch(**kwargs):
+            await asyncio.sleep(0)
+            raise Exception("upstream down")
+
+        with patch.object(
+            client, "_fetch_from_api_with_retries", new_callable=AsyncMock, side_effect=failing_fetch
+        ):
+            results = await asyncio.gather(
+                client.fetch_incidents(), client.fetch_incidents(), return_exceptions=True
+            )
+
+        assert all(isinstance(r, Exception) for r in results)
+
+
 class TestFetchFromApiWithRetries:
     async def test_success_on_first_attempt(self, client, raw_incident):
         mock_httpx = _make_httpx_mock([raw_incident])
@@ -130,7 +260,9 @@ class TestFetchFromApiWithRetries:
 
     async def test_success_after_two_failures(self, client, raw_incident):
         mock_response = MagicMock()
-        mock_response.json.return_value = [raw_incident]
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.content = orjson.dumps([raw_incident])
         mock_response.raise_for_status = MagicMock()
 
         call_count = 0
@@ -179,3 +311,261 @@ class TestFetchFromApiWithRetries:
 
         # Sleep called between retries (max_retries - 1 times = 2 times for 3 retries)
         assert sleep_mock.call_count == client.max_retries - 1
+
+
+class TestConnectionLimits:
+    def test_keepalive_outlives_cache_timeout(self, client):
+        limits = client._build_limits()
+        assert limits.keepalive_expiry > client.cache_timeout * 60
+
+    def test_keepalive_env_override(self, client):
+        with patch("api_client.config", dataclasses.replace(api_client.config, HTTPX_KEEPALIVE="12.5")):
+            limits = client._build_limits()
+        assert limits.keepalive_expiry == 12.5
+
+    def test_pool_sized_for_single_host(self, client):
+        limits = client._build_limits()
+        assert limits.max_connections == 4
+        assert limits.max_keepalive_connections == 2
+
+
+class TestSharedHttpClient:
+    async def test_client_reused_across_calls(self, client, raw_incident):
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx) as client_cls:
+            await client._fetch_from_api_with_retries()
+            await client._fetch_from_api_with_retries()
+
+        client_cls.assert_called_once()
+        assert mock_httpx.get.call_count == 2
+
+    async def test_aclose_closes_and_resets_client(self, client, raw_incident):
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client._fetch_from_api_with_retries()
+            await client.aclose()
+
+        mock_httpx.aclose.assert_awaited_once()
+        assert client._client is None
+
+    async def test_aclose_without_client_is_safe(self, client):
+        await client.aclose()  # should not raise
+
+    def test_advertises_compression(self, client):
+        with patch("api_client.httpx.AsyncClient") as client_cls:
+            client._get_client()
+        accept = client_cls.call_args.kwargs["headers"]["Accept-Encoding"]
+        assert "gzip" in accept
+
+    def test_brotli_advertised_only_when_installed(self):
+        with patch("api_client.importlib.util.find_spec", return_value=None):
+            assert "br" not in api_client._accept_encoding()
+        with patch("api_client.importlib.util.find_spec", return_value=object()):
+            assert api_client._accept_encoding().startswith("br")
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("GET", "https://phishstats.test/api/v1/")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def _make_failing_httpx_mock(error):
+    mock_response = MagicMock()
+    mock_response.raise_for_status = MagicMock(side_effect=error)
+    mock_httpx = AsyncMock()
+    mock_httpx.get = AsyncMock(return_value=mock_response)
+    return mock_httpx
+
+
+class TestConditionalRequests:
+    async def test_validators_stored_from_200(self, client, raw_incident):
+        mock_httpx = _make_httpx_mock(
+            [raw_incident], headers={"ETag": '"abc"', "Last-Modified": "Tue, 13 Oct 2026 10:00:00 GMT"}
+        )
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client._fetch_from_api_with_retries()
+
+        assert client._etag == '"abc"'
+        assert client._last_modified == "Tue, 13 Oct 2026 10:00:00 GMT"
+
+    async def test_conditional_request_sends_validators(self, client, raw_incident):
+        client._etag = '"abc"'
+        client._last_modified = "Tue, 13 Oct 2026 10:00:00 GMT"
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client._fetch_from_api_with_retries(conditional=True)
+
+        headers = mock_httpx.get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"abc"'
+        assert headers["If-Modified-Since"] == "Tue, 13 Oct 2026 10:00:00 GMT"
+
+    async def test_unconditional_request_sends_no_validators(self, client, raw_incident):
+        client._etag = '"abc"'
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client._fetch_from_api_with_retries()
+
+        assert mock_httpx.get.call_args.kwargs["headers"] == {}
+
+    async def test_304_returns_none(self, client):
+        mock_httpx = _make_httpx_mock(None, status_code=304)
+        client._etag = '"abc"'
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            result = await client._fetch_from_api_with_retries(conditional=True)
+
+        assert result is None
+
+    async def test_304_reuses_cache_and_resets_ttl(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        client.cache._cache["phishing_incidents"]["t"] -= timedelta(hours=1).total_seconds()
+        client._etag = '"abc"'
+        mock_httpx = _make_httpx_mock(None, status_code=304)
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            result = await client.fetch_incidents()
+
+        assert result == [raw_incident]
+        assert client.cache.age_seconds("phishing_incidents") < 5
+        assert mock_httpx.get.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+
+    async def test_304_after_entry_vanished_refetches_in_full(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        client.cache._cache["phishing_incidents"]["t"] -= timedelta(hours=1).total_seconds()
+        client._etag = '"abc"'
+        not_modified = _make_httpx_mock(None, status_code=304).get.return_value
+        full = _make_httpx_mock([raw_incident]).get.return_value
+
+        async def get(url, **kwargs):
+            if kwargs["headers"]:
+                client.cache.clear("phishing_incidents")  # evicted mid-request
+                return not_modified
+            return full
+
+        mock_httpx = _make_httpx_mock(None)
+        mock_httpx.get = AsyncMock(side_effect=get)
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            result = await client.fetch_incidents()
+
+        assert result == [raw_incident]
+        assert mock_httpx.get.call_count == 2
+        assert mock_httpx.get.call_args.kwargs["headers"] == {}
+        assert client.cache.get("phishing_incidents") == [raw_incident]
+
+    async def test_empty_cache_fetches_unconditionally(self, client, raw_incident):
+        client._etag = '"abc"'
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            result = await client.fetch_incidents()
+
+        assert result == [raw_incident]
+        assert mock_httpx.get.call_args.kwargs["headers"] == {}
+
+    async def test_new_payload_bumps_version(self, client, raw_incident):
+        mock_httpx = _make_httpx_mock([raw_incident])
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client.fetch_incidents()
+
+        assert client.version == 1
+
+    async def test_304_keeps_version(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        client.cache._cache["phishing_incidents"]["t"] -= timedelta(hours=1).total_seconds()
+        client._etag = '"abc"'
+        mock_httpx = _make_httpx_mock(None, status_code=304)
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx):
+            await client.fetch_incidents()
+
+        assert client.version == 0
+
+    async def test_payload_from_another_worker_bumps_version(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        await client.fetch_incidents()
+        seen = client.version
+        client.cache.set("phishing_incidents", [raw_incident, raw_incident])  # shared-cache write
+        await client.fetch_incidents()
+        assert client.version == seen + 1
+
+    async def test_rereading_same_payload_keeps_version(self, client, raw_incident):
+        client.cache.set("phishing_incidents", [raw_incident])
+        await client.fetch_incidents()
+        seen = client.version
+        await client.fetch_incidents()
+        assert client.version == seen
+
+    async def test_payload_tag_agrees_across_clients_sharing_a_cache(self, client, raw_incident):
+        other = PhishStatsClient()
+        other.cache = client.cache
+        client.cache.set("phishing_incidents", [raw_incident])
+        other.version = 5
+        await client.fetch_incidents()
+        await other.fetch_incidents()
+        assert client.payload_tag == other.payload_tag
+        assert client.version != other.version
+
+
+class TestRateLimit:
+    async def test_token_acquired_per_attempt(self, client):
+        mock_httpx = AsyncMock()
+        mock_httpx.get = AsyncMock(side_effect=httpx.RequestError("Connection failed"))
+        client._bucket.acquire = AsyncMock()
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx), \
+             patch("api_client.asyncio.sleep", new_callable=AsyncMock):
+            with pytest.raises(Exception):
+                await client._fetch_from_api_with_retries()
+
+        assert client._bucket.acquire.await_count == client.max_retries
+
+
+class TestRetryBackoff:
+    def test_backoff_stays_within_bounds(self, client):
+        delay = float(client.retry_delay)
+        for _ in range(50):
+            new_delay = client._next_backoff(delay)
+            assert client.retry_delay <= new_delay <= min(client.max_retry_delay, delay * 3)
+            delay = new_delay
+
+    def test_backoff_capped(self, client):
+        assert client._next_backoff(10_000) <= client.max_retry_delay
+
+    async def test_client_error_is_not_retried(self, client):
+        mock_httpx = _make_failing_httpx_mock(_status_error(404))
+        sleep_mock = AsyncMock()
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx), \
+             patch("api_client.asyncio.sleep", sleep_mock):
+            with pytest.raises(Exception, match="HTTP 404"):
+                await client._fetch_from_api_with_retries()
+
+        assert mock_httpx.get.call_count == 1
+        sleep_mock.assert_not_called()
+
+    async def test_rate_limited_is_retried(self, client):
+        mock_httpx = _make_failing_httpx_mock(_status_error(429))
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx), \
+             patch("api_client.asyncio.sleep", new_callable=AsyncMock):
+            with pytest.raises(Exception, match="after"):
+                await client._fetch_from_api_with_retries()
+
+        assert mock_httpx.get.call_count == client.max_retries
+
+    async def test_retry_after_header_is_honored(self, client):
+        mock_httpx = _make_failing_httpx_mock(_status_error(503, {"Retry-After": "7"}))
+        sleep_mock = AsyncMock()
+
+        with patch("api_client.httpx.AsyncClient", return_value=mock_httpx), \
+             patch("api_client.asyncio.sleep", sleep_mock):
+            with pytest.raises(Exception):
+                await client._fetch_from_api_with_retries()
+
+        assert all(call.args[0] == 7.0 for call in sleep_mock.call_args_list)
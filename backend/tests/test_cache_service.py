@@ -1,6 +1,8 @@
 import pytest
-from datetime import datetime, timedelta
-from services.cache_service import CacheService
+from datetime import timedelta
+from unittest.mock import patch
+import services.cache_service as cache_module
+from services.cache_service import CacheService, create_cache
 
 
 @pytest.fixture
@@ -37,13 +39,13 @@ class TestCacheServiceExpiry:
 
     def test_is_expired_stale_data_returns_true(self, cache):
         cache.set("key1", "value")
-        cache._cache["key1"]["timestamp"] = datetime.now() - timedelta(minutes=10)
+        cache._cache["key1"]["t"] -= timedelta(minutes=10).total_seconds()
         assert cache.is_expired("key1", timeout_minutes=5) is True
 
     def test_is_expired_exactly_at_boundary(self, cache):
         cache.set("key1", "value")
         # Just over the boundary → expired
-        cache._cache["key1"]["timestamp"] = datetime.now() - timedelta(minutes=5, seconds=1)
+        cache._cache["key1"]["t"] -= timedelta(minutes=5, seconds=1).total_seconds()
         assert cache.is_expired("key1", timeout_minutes=5) is True
 
     def test_is_expired_missing_key_returns_true(self, cache):
@@ -52,11 +54,32 @@ class TestCacheServiceExpiry:
     def test_is_expired_respects_custom_timeout(self, cache):
         cache.set("key1", "value")
         # 1 minute old — not expired under 2-minute timeout, expired under 0.5-minute timeout
-        cache._cache["key1"]["timestamp"] = datetime.now() - timedelta(minutes=1)
+        cache._cache["key1"]["t"] -= timedelta(minutes=1).total_seconds()
         assert cache.is_expired("key1", timeout_minutes=2) is False
         assert cache.is_expired("key1", timeout_minutes=0.5) is True
 
 
+class TestCacheServiceAge:
+    def test_age_missing_key_is_none(self, cache):
+        assert cache.age_seconds("nonexistent") is None
+
+    def test_age_reflects_timestamp(self, cache):
+        cache.set("key1", "value")
+        cache._cache["key1"]["t"] -= timedelta(seconds=90).total_seconds()
+        assert 90 <= cache.age_seconds("key1") < 95
+
+    def test_touch_resets_age_and_keeps_value(self, cache):
+        cache.set("key1", "value")
+        cache._cache["key1"]["t"] -= timedelta(seconds=90).total_seconds()
+        cache.touch("key1")
+        assert cache.age_seconds("key1") < 5
+        assert cache.get("key1") == "value"
+
+    def test_touch_missing_key_is_safe(self, cache):
+        cache.touch("nonexistent")  # should not raise
+        assert cache.age_seconds("nonexistent") is None
+
+
 class TestCacheServiceClear:
     def test_clear_specific_key_removes_it(self, cache):
         cache.set("key1", "v1")
@@ -84,6 +107,102 @@ class TestCacheServiceClear:
         cache.clear()  # should not raise
 
 
+class TestCacheServiceMemoize:
+    def test_computes_on_first_call(self, cache):
+        assert cache.memoize("k", 1, lambda: "computed") == "computed"
+
+    def test_same_version_reuses_value(self, cache):
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        cache.memoize("k", 1, compute)
+        assert cache.memoize("k", 1, compute) == 1
+        assert len(calls) == 1
+
+    def test_new_version_recomputes(self, cache):
+        cache.memoize("k", 1, lambda: "old")
+        assert cache.memoize("k", 2, lambda: "new") == "new"
+        assert cache.get("k") == "new"
+
+    def test_plain_set_entry_is_not_a_memo_hit(self, cache):
+        cache.set("k", "plain")
+        assert cache.memoize("k", 1, lambda: "computed") == "computed"
+
+
+class TestCacheServiceEviction:
+    def test_default_bound_from_config(self, cache):
+        from config import config
+        assert cache.maxsize == config.CACHE_MAX_ENTRIES
+
+    def test_oldest_key_evicted_past_maxsize(self):
+        cache = CacheService(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.get("c") == 3
+
+    def test_get_marks_key_recently_used(self):
+        cache = CacheService(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+    def test_expired_entry_kept_until_evicted(self):
+        cache = CacheService(maxsize=2)
+        cache.set("a", 1)
+        cache._cache["a"]["t"] -= timedelta(days=1).total_seconds()
+        assert cache.get("a") == 1
+
+
+class TestCreateCache:
+    def test_memory_backend_by_default(self):
+        cache = create_cache(ttl_seconds=600)
+        assert type(cache) is CacheService
+
+    def test_get_entry_returns_value_and_timestamps(self, cache):
+        cache.set("k", [1])
+        entry = cache.get_entry("k")
+        assert entry["value"] == [1]
+        assert entry["stored"] == entry["t"]
+
+    def test_touch_moves_timestamp_not_stored(self, cache):
+        cache.set("k", [1])
+        cache._cache["k"]["t"] -= timedelta(hours=1).total_seconds()
+        stored = cache.get_entry("k")["stored"]
+        cache.touch("k")
+        entry = cache.get_entry("k")
+        assert entry["stored"] == stored
+        assert entry["t"] >= stored
+
+    def test_entry_age_uses_the_cache_clock(self, cache, monkeypatch):
+        cache.set("k", [1])
+        entry = cache.get_entry("k")
+        monkeypatch.setattr(cache, "_clock", lambda: entry["t"] + 42.0)
+        assert cache.entry_age(entry) == pytest.approx(42.0)
+        assert cache.age_seconds("k") == pytest.approx(42.0)
+
+
+class TestCacheServiceAsync:
+    async def test_async_twins_match_sync_methods(self, cache):
+        await cache.aset("k", [1])
+        assert await cache.aget("k") == [1]
+        assert (await cache.aget_entry("k"))["value"] == [1]
+        await cache.atouch("k")
+        assert await cache.aage_seconds("k") < 5
+        await cache.aclear("k")
+        assert await cache.aget("k") is None
+
+    async def test_memory_backend_stays_on_the_event_loop(self, cache):
+        with patch.object(cache_module.asyncio, "to_thread") as to_thread:
+            await cache.aset("k", [1])
+            await cache.aget_entry("k")
+        to_thread.assert_not_called()
+
+
 class TestCacheServiceInfo:
     def test_get_cache_info_empty(self, cache):
         assert cache.get_cache_info() == {}
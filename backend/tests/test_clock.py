@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import clock
+from clock import now_iso_cached
+
+
+class TestNowIsoCached:
+    def setup_method(self):
+        clock._ts_cache[:] = [0.0, ""]
+
+    def test_returns_utc_iso_string(self):
+        stamp = now_iso_cached()
+        parsed = datetime.fromisoformat(stamp)
+        assert parsed.tzinfo == timezone.utc
+
+    def test_reused_within_same_second(self):
+        with patch("clock.time.time", return_value=1000.0):
+            first = now_iso_cached()
+        with patch("clock.time.time", return_value=1000.9):
+            second = now_iso_cached()
+        assert first is second
+
+    def test_refreshed_after_a_second(self):
+        with patch("clock.time.time", return_value=1000.0):
+            first = now_iso_cached()
+        with patch("clock.time.time", return_value=1001.0):
+            second = now_iso_cached()
+        assert first != second
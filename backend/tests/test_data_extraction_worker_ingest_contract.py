@@ -16,6 +16,12 @@ def test_ingest_cursor_sql_uses_newest_date():
     assert "GET_OLDEST_DATE_SQL" not in content
 
 
+def test_upsert_skips_unchanged_rows():
+    content = _read(WORKER_SRC / "queries.ts")
+    assert "ON CONFLICT(id) DO UPDATE SET" in content
+    assert "WHERE excluded.date_update IS NOT phishing_links.date_update" in content
+
+
 def test_phishstats_fetch_uses_forward_tail_filter():
     content = _read(WORKER_SRC / "phishstats.ts")
     assert '_sort: "date"' in content
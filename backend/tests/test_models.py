@@ -1,7 +1,8 @@
+import json
 import pytest
 from datetime import datetime
 from pydantic import ValidationError
-from models import PhishingIncident, MapPoint, HeatmapData, FilterRequest
+from models import PhishingIncident, MapPoint, HeatmapData, FilterRequest, canonical_threat_level, validate_incidents, dump_incidents_json, dump_map_points_json, iter_incidents_ndjson
 
 
 class TestPhishingIncident:
@@ -30,6 +31,12 @@ class TestPhishingIncident:
                 url="http://test.com", latitude=0.0, longitude=0.0, threat_level="danger"
             )
 
+    def test_threat_level_shared_across_incidents(self):
+        parsed = "".join(["Hi", "gh"])  # a fresh, non-interned str
+        a = PhishingIncident(url="http://a.com", latitude=0.0, longitude=0.0, threat_level=parsed)
+        b = PhishingIncident(url="http://b.com", latitude=0.0, longitude=0.0, threat_level="high")
+        assert a.threat_level is b.threat_level
+
     def test_threat_level_defaults_to_unknown(self):
         incident = PhishingIncident(url="http://test.com", latitude=0.0, longitude=0.0)
         assert incident.threat_level == "unknown"
@@ -87,7 +94,72 @@ class TestPhishingIncident:
             assert inc.threat_level == level
 
 
+class TestCanonicalThreatLevel:
+    def test_any_case_maps_to_shared_string(self):
+        assert canonical_threat_level("HIGH") == "high"
+        assert canonical_threat_level("High") is canonical_threat_level("high")
+
+    def test_unknown_level_is_none(self):
+        assert canonical_threat_level("sever") is None
+
+
+class TestValidateIncidents:
+    def test_returns_models_in_order(self):
+        rows = [
+            {"url": "http://a.com", "latitude": 1.0, "longitude": 2.0, "threat_level": "HIGH"},
+            {"url": "http://b.com", "latitude": 3.0, "longitude": 4.0},
+        ]
+        incidents = validate_incidents(rows)
+        assert [i.url for i in incidents] == ["http://a.com", "http://b.com"]
+        assert incidents[0].threat_level == "high"
+        assert all(isinstance(i, PhishingIncident) for i in incidents)
+
+    def test_empty_payload(self):
+        assert validate_incidents([]) == []
+
+    def test_any_invalid_row_raises(self):
+        rows = [
+            {"url": "http://a.com", "latitude": 1.0, "longitude": 2.0},
+            {"url": "http://b.com", "latitude": 99.0, "longitude": 4.0},
+        ]
+        with pytest.raises(ValidationError):
+            validate_incidents(rows)
+
+    def test_validated_incidents_are_frozen(self):
+        incident, = validate_incidents([{"url": "http://a.com", "latitude": 1.0, "longitude": 2.0}])
+        with pytest.raises(ValidationError):
+            incident.company = "PayPal"
+
+
+class TestDumpIncidentsJson:
+    def test_matches_model_dump_json_mode(self, sample_incidents):
+        body = dump_incidents_json(sample_incidents)
+        assert json.loads(body) == [i.model_dump(mode="json") for i in sample_incidents]
+
+    def test_empty_list(self):
+        assert dump_incidents_json([]) == b"[]"
+
+
+class TestIterIncidentsNdjson:
+    def test_one_line_per_incident(self, sample_incidents):
+        body = b"".join(iter_incidents_ndjson(sample_incidents))
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert rows == [i.model_dump(mode="json") for i in sample_incidents]
+
+    def test_batches_lines(self, sample_incidents):
+        chunks = list(iter_incidents_ndjson(sample_incidents, batch_size=2))
+        assert len(chunks) == 3
+        assert chunks[0].count(b"\n") == 2
+
+    def test_empty_yields_nothing(self):
+        assert list(iter_incidents_ndjson([])) == []
+
+
 class TestMapPoint:
+    def test_dump_map_points_json_matches_model_dump(self):
+        pts = [MapPoint(lat=1.0, lon=2.0, intensity=5, name="X", threat_level="low")]
+        assert json.loads(dump_map_points_json(pts)) == [p.model_dump(mode="json") for p in pts]
+
     def test_valid_map_point(self):
         pt = MapPoint(
             lat=40.7128, lon=-74.0060, intensity=8,
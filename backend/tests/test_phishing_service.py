@@ -1,7 +1,14 @@
+import asyncio
+import json
 import pytest
-from unittest.mock import AsyncMock
-from models import PhishingIncident, MapPoint
-from services.phishing_service import PhishingService, _incident_to_map_point, _THREAT_INTENSITY
+from array import array
+from unittest.mock import AsyncMock, patch
+import services.phishing_service as phishing_module
+from errors import ServiceError
+from models import HeatmapData, PhishingIncident, MapPoint
+from services.phishing_service import (
+    PhishingService, _incident_to_map_point, _THREAT_INTENSITY, decode_cursor, encode_cursor,
+)
 
 
 @pytest.fixture
@@ -32,11 +39,77 @@ class TestGetAllIncidents:
         assert len(result) == 1
         assert result[0].url == "http://valid.com"
 
+    async def test_invalid_rows_dropped_in_one_retry(self, service):
+        raw = [
+            {"url": "http://a.com", "latitude": 1.0, "longitude": 1.0},
+            {"url": "", "latitude": 40.0, "longitude": -74.0},
+            {"url": "http://b.com", "latitude": 2.0, "longitude": 2.0},
+            {"latitude": 40.0, "longitude": -74.0},
+        ]
+        service.api_client.fetch_incidents = AsyncMock(return_value=raw)
+        with patch.object(
+            phishing_module, "validate_incidents", wraps=phishing_module.validate_incidents
+        ) as validate:
+            result = await service.get_all_incidents()
+        assert [i.url for i in result] == ["http://a.com", "http://b.com"]
+        assert validate.call_count == 2
+
     async def test_returns_empty_list_when_no_incidents(self, service):
         service.api_client.fetch_incidents = AsyncMock(return_value=[])
         result = await service.get_all_incidents()
         assert result == []
 
+    async def test_validates_once_per_version(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        first = await service.get_all_incidents()
+        assert await service.get_all_incidents() is first
+        service.api_client.version += 1
+        assert await service.get_all_incidents() is not first
+
+    async def test_memo_eviction_does_not_revalidate(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        first = await service.get_all_incidents()
+        service._memo.clear()
+        with patch.object(phishing_module, "validate_incidents") as validate:
+            assert await service.get_all_incidents() is first
+        validate.assert_not_called()
+
+    async def test_concurrent_callers_share_one_validation(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        with patch.object(
+            phishing_module, "validate_incidents", wraps=phishing_module.validate_incidents
+        ) as validate:
+            results = await asyncio.gather(*(service.get_all_incidents() for _ in range(5)))
+        assert validate.call_count == 1
+        assert all(r is results[0] for r in results)
+
+    async def test_validation_runs_off_the_event_loop(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        with patch.object(
+            phishing_module.asyncio, "to_thread", wraps=phishing_module.asyncio.to_thread
+        ) as to_thread:
+            await service.get_all_incidents()
+        to_thread.assert_called_once()
+
+    async def test_upstream_failure_raises_service_error(self, service):
+        upstream = RuntimeError("connect to https://internal:8443 failed")
+        service.api_client.fetch_incidents = AsyncMock(side_effect=upstream)
+        with pytest.raises(ServiceError, match="^Could not fetch phishing incidents$") as exc_info:
+            await service.get_all_incidents()
+        assert exc_info.value.__cause__ is upstream
+
+    async def test_nested_service_error_keeps_innermost_message(self, service):
+        service.api_client.fetch_incidents = AsyncMock(side_effect=RuntimeError("boom"))
+        with pytest.raises(ServiceError, match="^Could not fetch phishing incidents$"):
+            await service.get_threat_statistics()
+
+
+class TestRefreshIncidents:
+    async def test_forces_refresh_and_counts_rows(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        assert await service.refresh_incidents() == len(sample_incidents)
+        service.api_client.fetch_incidents.assert_awaited_once_with(force_refresh=True)
+
 
 class TestGetFilteredIncidents:
     async def test_no_filters_returns_all(self, service, sample_incidents):
@@ -101,6 +174,148 @@ class TestGetFilteredIncidents:
         result = await service.get_filtered_incidents(company="Nonexistent Corp")
         assert result == []
 
+    async def test_combined_filters_match_linear_scan(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        result = await service.get_filtered_incidents(threat_level="CRITICAL", company="paypal")
+        expected = [
+            i for i in sample_incidents
+            if i.threat_level == "critical" and i.company and i.company.lower() == "paypal"
+        ]
+        assert [i.id for i in result] == [i.id for i in expected]
+
+    async def test_combined_filters_page_with_offset(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        everything = await service.get_filtered_incidents(company="paypal", isp="isp-a")
+        page = await service.get_filtered_incidents(company="paypal", isp="isp-a", limit=1, offset=1)
+        assert len(everything) == 2
+        assert [i.id for i in page] == [everything[1].id]
+
+    async def test_filter_index_rebuilt_on_new_version(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        await service.get_filtered_incidents(company="PayPal")
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents[:1]))
+        service.api_client.version += 1
+        result = await service.get_filtered_incidents(threat_level=sample_incidents[0].threat_level)
+        assert [i.id for i in result] == [sample_incidents[0].id]
+
+    async def test_after_id_matches_offset_pages(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        first = await service.get_filtered_incidents(limit=2)
+        second = await service.get_filtered_incidents(limit=2, after_id=first[-1].id)
+        assert second == await service.get_filtered_incidents(limit=2, offset=2)
+
+    async def test_after_id_applies_filters(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        first = await service.get_filtered_incidents(threat_level="critical", limit=1)
+        rest = await service.get_filtered_incidents(threat_level="critical", after_id=first[0].id)
+        assert len(rest) == 1
+        assert rest[0].threat_level == "critical"
+        assert rest[0].id != first[0].id
+
+    async def test_after_id_dropped_by_refresh_resumes_at_next_id(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        first = await service.get_filtered_incidents(limit=2)
+        assert [i.id for i in first] == [1, 2]
+        # A refresh replaces the payload and drops the cursor's incident
+        service.api_client.fetch_incidents = AsyncMock(
+            return_value=_raw([i for i in sample_incidents if i.id != 2])
+        )
+        service.api_client.version += 1
+        second = await service.get_filtered_incidents(limit=2, after_id=first[-1].id)
+        assert [i.id for i in second] == [3, 4]
+
+    async def test_after_id_past_the_end_is_empty_page(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        assert await service.get_filtered_incidents(after_id=999) == []
+
+    async def test_unknown_after_id_with_unordered_ids_is_empty_page(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents[::-1]))
+        assert await service.get_filtered_incidents(after_id=0) == []
+
+
+class TestCursor:
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor(12345)) == 12345
+
+    def test_cursor_is_url_safe(self):
+        assert "=" not in encode_cursor(7)
+
+    def test_garbage_raises_value_error(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestGetHeatmapJson:
+    async def test_matches_heatmap_model(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        heatmap = await service.get_heatmap_data(threat_level="critical", limit=10)
+        body = json.loads(await service.get_heatmap_json(threat_level="critical", limit=10))
+        assert body["coordinates"] == heatmap.coordinates
+        assert body["incident_count"] == heatmap.incident_count
+        assert HeatmapData.model_validate(body).last_updated is not None
+
+
+class TestGetHeatmapPacked:
+    async def test_packs_lat_then_lon_float32(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        body, count = await service.get_heatmap_packed(limit=2)
+        values = array("f", body)
+        assert count == 2
+        assert len(values) == 4
+        assert values[0] == pytest.approx(sample_incidents[0].latitude, abs=1e-4)
+        assert values[1] == pytest.approx(sample_incidents[1].latitude, abs=1e-4)
+        assert values[2] == pytest.approx(sample_incidents[0].longitude, abs=1e-4)
+
+    async def test_matches_json_heatmap_points(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        heatmap = await service.get_heatmap_data(threat_level="critical")
+        body, count = await service.get_heatmap_packed(threat_level="critical")
+        assert count == heatmap.incident_count
+        assert len(body) == 8 * len(heatmap.coordinates)
+
+    async def test_quantized_int16_grid(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        body, count = await service.get_heatmap_packed(limit=2, quantize=True)
+        values = array("h", body)
+        assert count == 2
+        assert len(values) == 4
+        scale = phishing_module.HEATMAP_QUANT_SCALE
+        assert values[0] == round(sample_incidents[0].latitude * scale)
+        assert values[2] == round(sample_incidents[0].longitude * scale)
+
+    async def test_points_computed_once_per_version(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        with patch.object(phishing_module, "_heatmap_points", wraps=phishing_module._heatmap_points) as points:
+            await service.get_heatmap_data(threat_level="CRITICAL")
+            await service.get_heatmap_packed(threat_level="critical")
+            assert points.call_count == 1
+            service.api_client.version += 1
+            await service.get_heatmap_data(threat_level="critical")
+            assert points.call_count == 2
+
+    async def test_varied_limits_do_not_evict_core_memo(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        await service.get_threat_statistics()
+        core = set(service._memo.get_cache_info())
+        for limit in range(1, 300):
+            await service.get_heatmap_packed(limit=limit)
+        assert core <= set(service._memo.get_cache_info())
+        assert len(service._heatmap_memo.get_cache_info()) <= phishing_module._HEATMAP_MEMO_ENTRIES
+
+    async def test_unknown_threat_level_is_not_cached(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        body = json.loads(await service.get_heatmap_json(threat_level="sever"))
+        assert body["incident_count"] == 0
+        assert service._heatmap_memo.get_cache_info() == {}
+
+    async def test_threat_level_case_shares_one_entry(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        await service.get_heatmap_json(threat_level="CRITICAL")
+        await service.get_heatmap_json(threat_level="critical")
+        assert sorted(service._heatmap_memo.get_cache_info()) == [
+            "heatmap:critical:100", "heatmap_json:critical:100",
+        ]
+
 
 class TestGetMapPoints:
     async def test_returns_map_points(self, service, sample_incidents):
@@ -193,3 +408,28 @@ class TestGetThreatStatistics:
         assert stats.total_incidents == 0
         assert stats.critical_count == 0
         assert stats.top_targeted_companies == []
+
+    async def test_tallies_computed_once_per_version(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        with patch.object(
+            phishing_module, "_threat_tallies", wraps=phishing_module._threat_tallies
+        ) as tally:
+            await service.get_threat_statistics()
+            await service.get_threat_statistics()
+            assert tally.call_count == 1
+            service.api_client.version += 1
+            await service.get_threat_statistics()
+            assert tally.call_count == 2
+
+
+class TestPrecompute:
+    async def test_later_requests_reuse_precomputed_results(self, service, sample_incidents):
+        service.api_client.fetch_incidents = AsyncMock(return_value=_raw(sample_incidents))
+        await service.precompute()
+        with patch.object(phishing_module, "_threat_tallies") as tally, \
+                patch.object(phishing_module, "_heatmap_points") as points:
+            await service.get_threat_statistics()
+            await service.get_heatmap_data()
+            await service.get_filtered_incidents(company="paypal")
+        tally.assert_not_called()
+        points.assert_not_called()
@@ -0,0 +1,37 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from services.rate_limiter import TokenBucket
+
+
+class TestTokenBucket:
+    async def test_burst_is_available_immediately(self):
+        bucket = TokenBucket(rate_per_min=60, burst=3)
+        sleep_mock = AsyncMock()
+        with patch("services.rate_limiter.asyncio.sleep", sleep_mock):
+            for _ in range(3):
+                await bucket.acquire()
+        sleep_mock.assert_not_called()
+
+    async def test_waits_when_bucket_empty(self):
+        bucket = TokenBucket(rate_per_min=60, burst=1)
+        await bucket.acquire()
+
+        async def fake_sleep(seconds):
+            bucket._last -= seconds  # pretend the time has passed
+
+        sleep_mock = AsyncMock(side_effect=fake_sleep)
+        with patch("services.rate_limiter.asyncio.sleep", sleep_mock):
+            await bucket.acquire()
+
+        sleep_mock.assert_called_once()
+        assert sleep_mock.call_args.args[0] == pytest.approx(1.0, abs=0.05)
+
+    async def test_refill_capped_at_burst(self):
+        bucket = TokenBucket(rate_per_min=60, burst=2)
+        bucket._last -= 3600
+        bucket._refill()
+        assert bucket._tokens == 2
+
+    def test_rate_converted_to_per_second(self):
+        bucket = TokenBucket(rate_per_min=20, burst=20)
+        assert bucket.rate_per_sec == pytest.approx(20 / 60)
@@ -0,0 +1,163 @@
+import fnmatch
+import pytest
+from unittest.mock import patch
+import services.cache_service as cache_module
+from services.redis_cache import RedisCacheService
+
+
+class FakeRedis:
+    """The slice of redis.Redis that RedisCacheService uses, in a dict."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.calls = []
+
+    def get(self, name):
+        self.calls.append(("get", name))
+        return self.data.get(name)
+
+    def mget(self, *names):
+        self.calls.append(("mget",) + names)
+        return [self.data.get(name) for name in names]
+
+    def setex(self, name, ttl, value):
+        self.calls.append(("setex", name, ttl))
+        self.data[name] = value
+        self.ttls[name] = ttl
+
+    def expire(self, name, ttl):
+        self.calls.append(("expire", name, ttl))
+        if name in self.data:
+            self.ttls[name] = ttl
+
+    def delete(self, *names):
+        self.calls.append(("delete",) + names)
+        names = [name.decode() if isinstance(name, bytes) else name for name in names]
+        removed = [name for name in names if self.data.pop(name, None) is not None]
+        return len(removed)
+
+    def scan_iter(self, match):
+        return [name.encode() for name in list(self.data) if fnmatch.fnmatchcase(name, match)]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, command):
+        return lambda *args: self.queued.append((command, args))
+
+    def execute(self):
+        return [getattr(self.client, command)(*args) for command, args in self.queued]
+
+
+@pytest.fixture
+def fake():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(fake):
+    return RedisCacheService("redis://unused", ttl_seconds=900, prefix="test:", client=fake)
+
+
+class TestRedisStorageHooks:
+    def test_set_then_get_round_trips_json(self, cache):
+        cache.set("k", [{"id": 1, "url": "http://a.com"}])
+        assert cache.get("k") == [{"id": 1, "url": "http://a.com"}]
+
+    def test_store_writes_meta_and_data_with_ttl(self, cache, fake):
+        cache.set("k", [1])
+        assert fake.ttls == {"test:meta:k": 900, "test:data:k": 900}
+
+    def test_values_are_orjson_not_pickle(self, cache, fake):
+        cache.set("k", {"a": 1})
+        assert fake.data["test:data:k"] == b'{"a":1}'
+
+    def test_missing_key_is_none(self, cache):
+        assert cache.get_entry("missing") is None
+
+    def test_unchanged_value_is_not_refetched(self, cache, fake):
+        cache.set("k", [1, 2, 3])
+        first = cache.get("k")
+        fake.calls.clear()
+        assert cache.get("k") is first
+        assert fake.calls == [("get", "test:meta:k")]
+
+    def test_value_written_by_another_worker_is_fetched(self, cache, fake):
+        cache.set("k", "old")
+        other = RedisCacheService("redis://unused", ttl_seconds=900, prefix="test:", client=fake)
+        other._clock = lambda: cache._clock() + 1
+        other.set("k", "new")
+        assert cache.get("k") == "new"
+
+    def test_touch_rewrites_only_meta(self, cache, fake):
+        cache.set("k", [1])
+        fake.calls.clear()
+        cache.touch("k")
+        assert ("setex", "test:meta:k", 900) in fake.calls
+        assert ("expire", "test:data:k", 900) in fake.calls
+        assert not any(call[:2] == ("setex", "test:data:k") for call in fake.calls)
+
+    def test_touch_moves_t_not_stored(self, cache):
+        cache.set("k", [1])
+        stored = cache.get_entry("k")["stored"]
+        with patch.object(cache, "_clock", lambda: stored + 60):
+            cache.touch("k")
+            assert cache.age_seconds("k") == pytest.approx(0)
+        entry = cache.get_entry("k")
+        assert entry["stored"] == stored
+        assert entry["t"] == stored + 60
+        assert entry["value"] == [1]
+
+    def test_memoize_reuses_value_for_same_version(self, cache):
+        assert cache.memoize("m", 1, lambda: [1]) == [1]
+        assert cache.memoize("m", 1, lambda: [2]) == [1]
+        assert cache.memoize("m", 2, lambda: [2]) == [2]
+
+    def test_delete_removes_both_keys(self, cache, fake):
+        cache.set("k", [1])
+        cache.clear("k")
+        assert fake.data == {}
+        assert cache.get("k") is None
+
+    def test_entries_lists_each_key_once(self, cache):
+        cache.set("a", [1])
+        cache.set("b", [1, 2])
+        assert {key: info["items"] for key, info in cache.get_cache_info().items()} == {"a": 1, "b": 2}
+
+    def test_clear_all_only_touches_own_prefix(self, cache, fake):
+        fake.data["other:meta:k"] = b"{}"
+        cache.set("a", [1])
+        cache.clear()
+        assert list(fake.data) == ["other:meta:k"]
+        assert cache.get("a") is None
+
+
+class TestRedisAsyncAccess:
+    async def test_async_methods_run_off_the_event_loop(self, cache):
+        with patch.object(
+            cache_module.asyncio, "to_thread", wraps=cache_module.asyncio.to_thread
+        ) as to_thread:
+            await cache.aset("k", [1])
+            entry = await cache.aget_entry("k")
+        assert entry["value"] == [1]
+        assert to_thread.call_count == 2
+
+
+class TestRedisPackageMissing:
+    def test_without_client_needs_redis_package(self):
+        with patch("services.redis_cache.redis", None):
+            with pytest.raises(RuntimeError, match="pip install redis"):
+                RedisCacheService("redis://localhost:6379/0", ttl_seconds=60)
@@ -0,0 +1,182 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from starlette.testclient import TestClient
+
+from middleware.response_cache import ResponseCacheMiddleware, etag_matches
+from services.cache_service import CacheService
+from services.redis_cache import RedisCacheService
+from tests.test_redis_cache import FakeRedis
+
+# Not valid UTF-8: must still replay byte for byte
+_PACKED = bytes(range(256))
+
+
+@pytest.fixture
+def cache():
+    return CacheService()
+
+
+@pytest.fixture
+def calls():
+    return {"count": 0, "fail": False}
+
+
+def _app(cache, calls):
+    app = FastAPI()
+
+    @app.get("/api/analytics/overview")
+    async def overview(limit: int = 10):
+        calls["count"] += 1
+        if calls["fail"]:
+            raise HTTPException(status_code=500, detail="boom")
+        return {"call": calls["count"], "limit": limit}
+
+    @app.get("/api/phishing/stats")
+    async def stats():
+        calls["count"] += 1
+        return Response(content=b'{"total_incidents":1}', media_type="application/json", headers={"ETag": 'W/"7-stats"'})
+
+    @app.get("/api/phishing/heatmap")
+    async def heatmap():
+        calls["count"] += 1
+        return Response(content=_PACKED, media_type="application/octet-stream")
+
+    @app.get("/api/analytics/health")
+    async def health():
+        calls["count"] += 1
+        return {"status": "healthy"}
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    return app
+
+
+@pytest.fixture
+def client(cache, calls):
+    with TestClient(_app(cache, calls)) as c:
+        yield c
+
+
+class TestEtagMatches:
+    def test_weak_and_strong_forms_match(self):
+        assert etag_matches('"7-stats"', 'W/"7-stats"')
+        assert etag_matches('W/"7-stats"', 'W/"7-stats"')
+
+    def test_any_listed_tag_matches(self):
+        assert etag_matches('W/"1-stats", W/"7-stats"', 'W/"7-stats"')
+
+    def test_star_matches(self):
+        assert etag_matches("*", 'W/"7-stats"')
+
+    def test_other_or_missing_tag_does_not_match(self):
+        assert not etag_matches('W/"8-stats"', 'W/"7-stats"')
+        assert not etag_matches(None, 'W/"7-stats"')
+
+
+class TestResponseCacheConditional:
+    def test_fresh_hit_with_matching_etag_is_304(self, client, calls):
+        first = client.get("/api/phishing/stats")
+        r = client.get("/api/phishing/stats", headers={"If-None-Match": first.headers["etag"]})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == 'W/"7-stats"'
+        assert calls["count"] == 1
+
+    def test_fresh_hit_with_other_etag_replays_body(self, client):
+        client.get("/api/phishing/stats")
+        r = client.get("/api/phishing/stats", headers={"If-None-Match": 'W/"6-stats"'})
+        assert r.status_code == 200
+        assert r.json() == {"total_incidents": 1}
+
+
+def _expire(cache):
+    for entry in cache._cache.values():
+        entry["t"] -= 86400 * 365
+
+
+class TestResponseCacheHits:
+    def test_first_request_is_miss(self, client):
+        r = client.get("/api/analytics/overview")
+        assert r.status_code == 200
+        assert r.headers["x-cache"] == "MISS"
+
+    def test_second_request_replayed_without_handler(self, client, calls):
+        first = client.get("/api/analytics/overview")
+        second = client.get("/api/analytics/overview")
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert calls["count"] == 1
+
+    def test_query_string_is_part_of_key(self, client, calls):
+        client.get("/api/analytics/overview?limit=5")
+        r = client.get("/api/analytics/overview?limit=6")
+        assert r.json()["limit"] == 6
+        assert calls["count"] == 2
+
+    def test_accept_header_is_part_of_key(self, client, calls):
+        client.get("/api/analytics/overview", headers={"Accept": "application/json"})
+        r = client.get("/api/analytics/overview", headers={"Accept": "application/octet-stream"})
+        assert r.headers["x-cache"] == "MISS"
+        assert calls["count"] == 2
+
+    def test_expired_entry_refetched(self, client, cache, calls):
+        client.get("/api/analytics/overview")
+        _expire(cache)
+        r = client.get("/api/analytics/overview")
+        assert r.headers["x-cache"] == "MISS"
+        assert calls["count"] == 2
+
+    def test_unlisted_path_not_cached(self, client, calls):
+        client.get("/api/analytics/health")
+        r = client.get("/api/analytics/health")
+        assert "x-cache" not in r.headers
+        assert calls["count"] == 2
+
+
+class TestResponseCacheStaleFallback:
+    def test_error_served_from_stale_entry(self, client, cache, calls):
+        first = client.get("/api/analytics/overview")
+        _expire(cache)
+        calls["fail"] = True
+        r = client.get("/api/analytics/overview")
+        assert r.status_code == 200
+        assert r.headers["x-cache"] == "STALE"
+        assert r.json() == first.json()
+
+    def test_error_without_entry_passes_through(self, client, calls):
+        calls["fail"] = True
+        r = client.get("/api/analytics/overview")
+        assert r.status_code == 500
+
+    def test_error_response_not_cached(self, client, calls):
+        calls["fail"] = True
+        client.get("/api/analytics/overview")
+        calls["fail"] = False
+        r = client.get("/api/analytics/overview")
+        assert r.status_code == 200
+        assert r.headers["x-cache"] == "MISS"
+
+
+class TestResponseCacheSharedStore:
+    @pytest.fixture
+    def workers(self, calls):
+        fake = FakeRedis()
+        caches = [RedisCacheService("redis://unused", ttl_seconds=60, prefix="r:", client=fake) for _ in range(2)]
+        with TestClient(_app(caches[0], calls)) as one, TestClient(_app(caches[1], calls)) as two:
+            yield caches, one, two
+
+    def test_binary_body_replayed_byte_for_byte(self, workers, calls):
+        _, one, two = workers
+        one.get("/api/phishing/heatmap")
+        r = two.get("/api/phishing/heatmap")
+        assert r.headers["x-cache"] == "HIT"
+        assert r.content == _PACKED
+        assert calls["count"] == 1
+
+    def test_clear_on_one_worker_reaches_the_other(self, workers, calls):
+        caches, one, two = workers
+        one.get("/api/analytics/overview")
+        two.get("/api/analytics/overview")
+        caches[0].clear()
+        r = two.get("/api/analytics/overview")
+        assert r.headers["x-cache"] == "MISS"
+        assert calls["count"] == 2
@@ -1,21 +1,36 @@
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, patch
 from starlette.testclient import TestClient
 from datetime import datetime
 
+import main
 from main import app
-import routes.phishing as phishing_routes
-import routes.analytics as analytics_routes
+from errors import ServiceError
+from middleware import response_cache
 from models import MapPoint, HeatmapData, ThreatStatistics
+from services.phishing_service import encode_cursor
 
 
 @pytest.fixture
 def client():
+    response_cache.clear()
     with TestClient(app) as c:
         yield c
 
 
+@pytest.fixture
+def data_tag(client):
+    """Pin the payload tag behind ETags so routes don't fetch for it."""
+    with patch.object(app.state.phishing_service, "data_tag", AsyncMock(return_value="1.5")) as tag:
+        yield tag
+
+
 class TestAppEndpoints:
+    def test_lifespan_shares_one_phishing_service(self, client):
+        assert app.state.analytics_service.phishing_service is app.state.phishing_service
+
     def test_health_returns_healthy(self, client):
         r = client.get("/health")
         assert r.status_code == 200
@@ -37,11 +52,59 @@ class TestAppEndpoints:
         assert "phishing" in body["endpoints"]
         assert "analytics" in body["endpoints"]
 
+    def test_openapi_schema_served(self, client):
+        first = client.get("/openapi.json")
+        second = client.get("/openapi.json")
+        assert first.status_code == 200
+        assert "/api/phishing/heatmap" in first.json()["paths"]
+        assert first.content == second.content
+
+    def test_large_response_is_gzipped(self, client):
+        r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+
+    def test_small_response_not_compressed(self, client):
+        r = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers
+
+    def test_docs_pages_served(self, client):
+        assert "swagger-ui" in client.get("/docs").text
+        assert "redoc" in client.get("/redoc").text
+
+
+class TestCors:
+    def test_allowed_origin_is_echoed(self, client):
+        r = client.get("/health", headers={"Origin": "http://localhost:3000"})
+        assert r.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+    def test_preflight_lists_allowed_methods(self, client):
+        r = client.options(
+            "/api/phishing/heatmap",
+            headers={
+                "Origin": "http://localhost:3000",
+                "Access-Control-Request-Method": "GET",
+                "Access-Control-Request-Headers": "content-type",
+            },
+        )
+        assert r.status_code == 200
+        assert r.headers["access-control-allow-methods"] == "GET, OPTIONS"
+
+    def test_preflight_rejects_unlisted_method(self, client):
+        r = client.options(
+            "/api/phishing/heatmap",
+            headers={"Origin": "http://localhost:3000", "Access-Control-Request-Method": "DELETE"},
+        )
+        assert r.status_code == 400
+
+    def test_unknown_origin_gets_no_cors_headers(self, client):
+        r = client.get("/health", headers={"Origin": "http://evil.example"})
+        assert "access-control-allow-origin" not in r.headers
+
 
 class TestPhishingRoutes:
     def test_map_points_success(self, client, sample_map_point):
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_map_points",
             AsyncMock(return_value=[sample_map_point]),
         ):
@@ -54,7 +117,7 @@ class TestPhishingRoutes:
 
     def test_map_points_empty_result(self, client):
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_map_points",
             AsyncMock(return_value=[]),
         ):
@@ -72,23 +135,45 @@ class TestPhishingRoutes:
 
     def test_map_points_service_error_returns_500(self, client):
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_map_points",
-            AsyncMock(side_effect=Exception("API failure")),
+            AsyncMock(side_effect=ServiceError("Could not filter phishing incidents")),
         ):
             r = client.get("/api/phishing/map-points")
         assert r.status_code == 500
+        assert r.json()["detail"] == "Could not filter phishing incidents"
+
+    def test_service_error_response_has_cors_headers(self, client):
+        origin = main._cors_origins[0]
+        with patch.object(
+            app.state.phishing_service,
+            "get_map_points",
+            AsyncMock(side_effect=ServiceError("Could not filter phishing incidents")),
+        ):
+            r = client.get("/api/phishing/map-points", headers={"Origin": origin})
+        assert r.status_code == 500
+        assert r.headers["access-control-allow-origin"] == origin
+
+    def test_refresh_error_hides_upstream_message(self, client):
+        with patch.object(
+            app.state.phishing_service.api_client,
+            "fetch_incidents",
+            AsyncMock(side_effect=Exception("connect to https://internal:8443 failed")),
+        ):
+            r = client.get("/api/phishing/refresh")
+        assert r.status_code == 500
+        assert r.json()["detail"] == "Could not refresh phishing incidents"
 
-    def test_heatmap_success(self, client):
+    def test_heatmap_success(self, client, data_tag):
         heatmap = HeatmapData(
             coordinates=[[40.7, -74.0], [51.5, -0.1]],
             incident_count=2,
             last_updated=datetime.now(),
         )
         with patch.object(
-            phishing_routes.phishing_service,
-            "get_heatmap_data",
-            AsyncMock(return_value=heatmap),
+            app.state.phishing_service,
+            "get_heatmap_json",
+            AsyncMock(return_value=heatmap.model_dump_json().encode()),
         ):
             r = client.get("/api/phishing/heatmap")
         assert r.status_code == 200
@@ -96,13 +181,54 @@ class TestPhishingRoutes:
         assert body["incident_count"] == 2
         assert len(body["coordinates"]) == 2
 
+    def test_heatmap_octet_stream(self, client, data_tag):
+        with patch.object(
+            app.state.phishing_service,
+            "get_heatmap_packed",
+            AsyncMock(return_value=(b"\x00" * 16, 2)),
+        ):
+            r = client.get("/api/phishing/heatmap", headers={"Accept": "application/octet-stream"})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/octet-stream"
+        assert r.headers["x-incident-count"] == "2"
+        assert len(r.content) == 16
+
+    def test_heatmap_octet_stream_quantized(self, client, data_tag):
+        packed = AsyncMock(return_value=(b"\x00" * 8, 2))
+        with patch.object(app.state.phishing_service, "get_heatmap_packed", packed):
+            r = client.get(
+                "/api/phishing/heatmap?quantize=true",
+                headers={"Accept": "application/octet-stream"},
+            )
+        assert r.status_code == 200
+        assert r.headers["x-heatmap-scale"] == "0.01"
+        assert packed.await_args.kwargs["quantize"] is True
+
+    def test_heatmap_304_when_etag_matches(self, client, data_tag):
+        with patch.object(app.state.phishing_service, "get_heatmap_json", AsyncMock()) as build:
+            etag = 'W/"1.5-json-critical-100-0"'
+            r = client.get(
+                "/api/phishing/heatmap?threat_level=CRITICAL",
+                headers={"If-None-Match": etag},
+            )
+        assert r.status_code == 304
+        assert r.headers["etag"] == etag
+        build.assert_not_awaited()
+
+    def test_heatmap_etag_changes_with_format(self, client, data_tag):
+        with patch.object(
+            app.state.phishing_service, "get_heatmap_packed", AsyncMock(return_value=(b"", 0))
+        ):
+            r = client.get("/api/phishing/heatmap", headers={"Accept": "application/octet-stream"})
+        assert r.headers["etag"] == 'W/"1.5-bin--100-0"'
+
     def test_heatmap_invalid_limit_returns_422(self, client):
         r = client.get("/api/phishing/heatmap?limit=0")
         assert r.status_code == 422
 
     def test_get_all_incidents_success(self, client, sample_incidents):
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_filtered_incidents",
             AsyncMock(return_value=sample_incidents),
         ):
@@ -110,7 +236,78 @@ class TestPhishingRoutes:
         assert r.status_code == 200
         assert len(r.json()) == len(sample_incidents)
 
-    def test_stats_success(self, client):
+    def test_full_page_sets_next_cursor(self, client, sample_incidents):
+        with patch.object(
+            app.state.phishing_service,
+            "get_filtered_incidents",
+            AsyncMock(return_value=sample_incidents[:2]),
+        ):
+            r = client.get("/api/phishing/?limit=2")
+        assert r.status_code == 200
+        assert r.headers["x-next-cursor"] == encode_cursor(sample_incidents[1].id)
+
+    def test_short_page_has_no_next_cursor(self, client, sample_incidents):
+        with patch.object(
+            app.state.phishing_service,
+            "get_filtered_incidents",
+            AsyncMock(return_value=sample_incidents[:2]),
+        ):
+            r = client.get("/api/phishing/?limit=10")
+        assert "x-next-cursor" not in r.headers
+
+    def test_cursor_is_decoded_for_service(self, client, sample_incidents):
+        mock = AsyncMock(return_value=[])
+        with patch.object(app.state.phishing_service, "get_filtered_incidents", mock):
+            r = client.get(f"/api/phishing/filtered?cursor={encode_cursor(3)}")
+        assert r.status_code == 200
+        assert mock.call_args.kwargs["after_id"] == 3
+
+    def test_malformed_cursor_returns_400(self, client):
+        r = client.get("/api/phishing/?cursor=not-a-cursor")
+        assert r.status_code == 400
+
+    def test_repeat_request_served_from_cache(self, client, sample_incidents):
+        mock = AsyncMock(return_value=sample_incidents)
+        with patch.object(app.state.phishing_service, "get_filtered_incidents", mock):
+            client.get("/api/phishing/filtered?company=PayPal")
+            r = client.get("/api/phishing/filtered?company=PayPal")
+        assert r.headers["x-cache"] == "HIT"
+        assert mock.await_count == 1
+
+    def test_refresh_clears_response_cache(self, client, sample_incidents):
+        with patch.object(
+            app.state.phishing_service,
+            "get_filtered_incidents",
+            AsyncMock(return_value=sample_incidents),
+        ), patch.object(
+            app.state.phishing_service.api_client,
+            "fetch_incidents",
+            AsyncMock(return_value=[]),
+        ):
+            client.get("/api/phishing/")
+            client.get("/api/phishing/refresh")
+            r = client.get("/api/phishing/")
+        assert r.headers["x-cache"] == "MISS"
+
+    def test_stream_returns_ndjson_lines(self, client, sample_incidents):
+        with patch.object(
+            app.state.phishing_service,
+            "get_filtered_incidents",
+            AsyncMock(return_value=sample_incidents),
+        ):
+            r = client.get("/api/phishing/stream?limit=5")
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/x-ndjson"
+        lines = r.text.splitlines()
+        assert len(lines) == len(sample_incidents)
+        assert json.loads(lines[0])["id"] == sample_incidents[0].id
+        assert r.headers["x-next-cursor"] == encode_cursor(sample_incidents[-1].id)
+
+    def test_stream_malformed_cursor_returns_400(self, client):
+        r = client.get("/api/phishing/stream?cursor=not-a-cursor")
+        assert r.status_code == 400
+
+    def test_stats_success(self, client, data_tag):
         stats = ThreatStatistics(
             total_incidents=100,
             critical_count=10,
@@ -121,7 +318,7 @@ class TestPhishingRoutes:
             last_updated=datetime.now(),
         )
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_threat_statistics",
             AsyncMock(return_value=stats),
         ):
@@ -130,11 +327,19 @@ class TestPhishingRoutes:
         body = r.json()
         assert body["total_incidents"] == 100
         assert body["critical_count"] == 10
+        assert body == json.loads(stats.model_dump_json())
+        assert r.headers["etag"] == 'W/"1.5-stats"'
+
+    def test_stats_304_when_etag_matches(self, client, data_tag):
+        with patch.object(app.state.phishing_service, "get_threat_statistics", AsyncMock()) as build:
+            r = client.get("/api/phishing/stats", headers={"If-None-Match": 'W/"1.5-stats"'})
+        assert r.status_code == 304
+        build.assert_not_awaited()
 
     def test_filtered_success(self, client, sample_incidents):
         critical = [i for i in sample_incidents if i.threat_level == "critical"]
         with patch.object(
-            phishing_routes.phishing_service,
+            app.state.phishing_service,
             "get_filtered_incidents",
             AsyncMock(return_value=critical),
         ):
@@ -160,7 +365,7 @@ class TestAnalyticsRoutes:
             "last_updated": datetime.now().isoformat(),
         }
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_threat_overview",
             AsyncMock(return_value=mock_overview),
         ):
@@ -170,10 +375,37 @@ class TestAnalyticsRoutes:
         assert body["total_incidents"] == 5
         assert "threat_distribution" in body
 
+    def test_overview_error_returns_500(self, client):
+        with patch.object(
+            app.state.analytics_service,
+            "get_threat_overview",
+            AsyncMock(side_effect=ServiceError("upstream down")),
+        ):
+            r = client.get("/api/analytics/overview")
+        assert r.status_code == 500
+        assert r.json()["detail"] == "upstream down"
+
+    def test_top_regions_error_returns_500(self, client):
+        with patch.object(
+            app.state.analytics_service,
+            "get_top_threat_regions",
+            AsyncMock(side_effect=ServiceError("upstream down")),
+        ):
+            r = client.get("/api/analytics/top-regions")
+        assert r.status_code == 500
+        assert r.json()["detail"] == "upstream down"
+
+    def test_overview_rejects_post(self, client):
+        r = client.post("/api/analytics/overview")
+        assert r.status_code == 405
+
+    def test_overview_is_documented(self, client):
+        assert "/api/analytics/overview" in client.get("/openapi.json").json()["paths"]
+
     def test_threat_distribution_success(self, client):
         dist = {"critical": 2, "high": 1, "low": 1, "moderate": 1, "elevated": 0, "none": 0, "unknown": 0}
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_threat_levels_distribution",
             AsyncMock(return_value=dist),
         ):
@@ -183,7 +415,7 @@ class TestAnalyticsRoutes:
 
     def test_top_regions_success(self, client):
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_top_threat_regions",
             AsyncMock(return_value=[("US", 5), ("UK", 2)]),
         ):
@@ -198,7 +430,7 @@ class TestAnalyticsRoutes:
 
     def test_top_companies_success(self, client):
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_most_targeted_companies",
             AsyncMock(return_value=[("PayPal", 3)]),
         ):
@@ -208,7 +440,7 @@ class TestAnalyticsRoutes:
 
     def test_isp_rankings_success(self, client):
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_isp_threat_rankings",
             AsyncMock(return_value=[("ISP-A", 2)]),
         ):
@@ -219,10 +451,22 @@ class TestAnalyticsRoutes:
     def test_threat_hotspots_success(self, client):
         hotspots = [{"country": "US", "total_incidents": 3, "critical": 1, "high": 2, "medium": 0, "low": 0}]
         with patch.object(
-            analytics_routes.analytics_service,
+            app.state.analytics_service,
             "get_threat_hotspots",
             AsyncMock(return_value=hotspots),
         ):
             r = client.get("/api/analytics/threat-hotspots")
         assert r.status_code == 200
         assert r.json()[0]["country"] == "US"
+
+
+class TestPrecomputeLoop:
+    async def test_precomputes_each_round_and_survives_errors(self):
+        phishing_service = AsyncMock()
+        phishing_service.precompute.side_effect = [RuntimeError("upstream down"), None, asyncio.CancelledError()]
+        analytics_service = AsyncMock()
+        with patch.object(main.asyncio, "sleep", AsyncMock()):
+            with pytest.raises(asyncio.CancelledError):
+                await main._precompute_loop(phishing_service, analytics_service, 60)
+        assert phishing_service.precompute.await_count == 3
+        analytics_service.precompute.assert_awaited_once()
@@ -1,8 +1,56 @@
 from reactpy import component, html, run, hooks
 import folium
-from folium.plugins import HeatMap, MarkerCluster
+from folium.plugins import FastMarkerCluster, HeatMap
+import os
 import pandas as pd
-import requests
+import httpx
+
+
+# Leaflet builds each marker in the browser from the JSON array that
+# FastMarkerCluster ships, so Python never creates per-marker objects
+_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup("Phishing Detected");
+    return marker;
+};
+"""
+
+
+def build_map_html(data):
+    """Render the heatmap + marker cluster for [lat, lon] pairs to HTML."""
+    # Initialize the world map
+    m = folium.Map(location=[20, 0], zoom_start=2, tiles="cartodb positron")
+
+    # --- INSERTED CODE: HEATMAP LOGIC ---
+    # HeatMap takes a list of [lat, lon] points
+    HeatMap(data, radius=15, blur=10).add_to(m)
+
+    # Optional: Add MarkerCluster for "digging in" (Matthew's suggestion)
+    # Limiting to 50 markers for performance
+    FastMarkerCluster(data[:50], callback=_MARKER_CALLBACK).add_to(m)
+    # ---------------------------------------
+
+    return m._repr_html_()
+
+
+# 2. MAP COMPONENT (Bryon)
+# -----------------------------------------------------------------------
+# Defined at module level so it keeps its hook state (and the memoized
+# HTML) across App re-renders instead of remounting each time.
+@component
+def MapView(data):
+    # Folium builds a large HTML/JS string; only rebuild it when the
+    # data list itself changes (set_phish_data always passes a new list)
+    map_html = hooks.use_memo(lambda: build_map_html(data) if data else None, [data])
+
+    if not data:
+        return html.div({"style": {"padding": "20px"}}, "📡 Connecting to PhishStats API...")
+
+    return html.div({
+        "dangerouslySetInnerHTML": {"__html": map_html},
+        "style": {"height": "80vh", "width": "100%"}
+    })
 
 
 @component
@@ -11,45 +59,22 @@ def App():
     # -------------------------------------------------------------------
     phish_data, set_phish_data = hooks.use_state([])
 
-    # This hook fetches the data from the PhishStats API once on startup
+    # This hook fetches the heatmap from our backend once on startup.
+    # The backend caches PhishStats data (and respects its rate limit), and
+    # the async client keeps the ReactPy event loop free while we wait.
     @hooks.use_effect(dependencies=[])
     async def fetch_phish_data():
+        base = os.getenv("VILLAIN_API_BASE", "http://127.0.0.1:8000").rstrip("/")
         try:
             # Fetching the last 100 incidents (per your proposal size limits)
-            response = requests.get("https://phishstats.info:20443/api/v1/", timeout=10)
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(f"{base}/api/phishing/heatmap", params={"limit": 100})
             if response.status_code == 200:
-                data = response.json()
-                # We only need [lat, lon] for the heatmap
-                coords = [[item['latitude'], item['longitude']] for item in data if item.get('latitude')]
-                set_phish_data(coords)
+                # Already [lat, lon] pairs, ready for HeatMap
+                set_phish_data(response.json()["coordinates"])
         except Exception as e:
             print(f"Error fetching data: {e}")
 
-    # 2. MAP COMPONENT (Bryon)
-    # -------------------------------------------------------------------
-    @component
-    def MapView(data):
-        if not data:
-            return html.div({"style": {"padding": "20px"}}, "📡 Connecting to PhishStats API...")
-
-        # Initialize the world map
-        m = folium.Map(location=[20, 0], zoom_start=2, tiles="cartodb positron")
-
-        # --- INSERTED CODE: HEATMAP LOGIC ---
-        # HeatMap takes a list of [lat, lon] points
-        HeatMap(data, radius=15, blur=10).add_to(m)
-
-        # Optional: Add MarkerCluster for "digging in" (Matthew's suggestion)
-        marker_cluster = MarkerCluster().add_to(m)
-        for lat, lon in data[:50]:  # Limiting to 50 markers for performance
-            folium.Marker([lat, lon], popup="Phishing Detected").add_to(marker_cluster)
-        # ---------------------------------------
-
-        return html.div({
-            "dangerouslySetInnerHTML": {"__html": m._repr_html_()},
-            "style": {"height": "80vh", "width": "100%"}
-        })
-
     return html.div(
         {"style": {"font-family": "Arial", "padding": "20px"}},
         html.h1("ShowMeTheVillain: Global Phishing Tracker"),